@@ -0,0 +1,96 @@
+"""
+Compare the memory held by 10k fetched emails as plain dicts versus EmailRecord.
+
+Both pure-ASCII bodies and bodies with a single non-Latin-1 character are
+measured. The saving mostly comes from the second case: one such character
+makes Python store the whole decoded str at two bytes per character, while
+EmailRecord keeps the UTF-8 bytes.
+
+Run from the repository root:
+    python -m benchmarks.bench_email_records
+"""
+import base64
+import gc
+import random
+import string
+import tracemalloc
+from src.email_record import EmailRecord
+
+MESSAGE_COUNT = 10_000
+BODY_CHARS = 2_000
+
+
+def make_raw_messages(count, suffix=""):
+    """
+    Build synthetic (headers, encoded body) pairs shaped like Gmail responses.
+
+    Each body is random ASCII text ending in suffix, e.g. a typographic quote.
+    """
+    rng = random.Random(0)
+    messages = []
+    for i in range(count):
+        body = "".join(rng.choices(string.ascii_letters + " \n", k=BODY_CHARS - len(suffix))) + suffix
+        messages.append({
+            'id': f"msg{i:06d}",
+            'threadId': f"thr{i // 3:06d}",
+            'internalDate': str(1_700_000_000_000 + i * 60_000),
+            'subject': f"Status update {i}",
+            'from': f"Sender {i % 500} <sender{i % 500}@example.com>",
+            'date': "Mon, 1 Jan 2024 10:00:00 +0000",
+            'data': base64.urlsafe_b64encode(body.encode('utf-8')).decode('ascii')
+        })
+    return messages
+
+
+def as_dicts(raw_messages):
+    """The previous representation: one dict per email with the decoded body."""
+    return [{
+        'id': m['id'],
+        'thread_id': m['threadId'],
+        'internal_date': int(m['internalDate']),
+        'subject': m['subject'],
+        'from': m['from'],
+        'received': m['date'],
+        'body': base64.urlsafe_b64decode(m['data']).decode('utf-8')
+    } for m in raw_messages]
+
+
+def as_records(raw_messages):
+    """The compact representation: slotted records with the body kept as bytes."""
+    return [EmailRecord(
+        id=m['id'],
+        thread_id=m['threadId'],
+        internal_date=int(m['internalDate']),
+        subject=m['subject'],
+        sender=m['from'],
+        received=m['date'],
+        body=base64.urlsafe_b64decode(m['data'])
+    ) for m in raw_messages]
+
+
+def measure(build, raw_messages):
+    """Return the bytes still allocated by the result of build(raw_messages)."""
+    gc.collect()
+    tracemalloc.start()
+    result = build(raw_messages)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return current
+
+
+def main():
+    print(f"{MESSAGE_COUNT} messages, {BODY_CHARS} body chars each")
+    cases = [("ASCII bodies", ""), ("bodies with \u2019 and \u20ac", "\u2019\u20ac")]
+    for label, suffix in cases:
+        raw_messages = make_raw_messages(MESSAGE_COUNT, suffix)
+        dict_bytes = measure(as_dicts, raw_messages)
+        record_bytes = measure(as_records, raw_messages)
+        print(label)
+        print(f"  dicts with decoded body : {dict_bytes / 1e6:8.2f} MB")
+        print(f"  EmailRecord (lazy body) : {record_bytes / 1e6:8.2f} MB")
+        print(f"  reduction               : {1 - record_bytes / dict_bytes:8.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Measure chat throughput of the Ollama pool against local stub servers.
+
+Each stub answers /api/tags and /api/chat after a fixed delay, standing in for
+a CPU-only Ollama box. The run compares one node with several, then stops a
+node mid-run to show requests failing over to the others.
+
+Run from the repository root:
+    python -m benchmarks.bench_llm_backend
+"""
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from src.llm_backend import OllamaPool
+
+NODE_COUNT = 3
+REQUEST_COUNT = 60
+CONCURRENCY = 12
+# Seconds a stub takes to "generate" a summary
+STUB_LATENCY = 0.2
+# Requests a stub handles at once, like a CPU box running one model
+STUB_SLOTS = 2
+
+
+class StubOllama(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self._reply({'models': []})
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        with self.server.slots:
+            time.sleep(STUB_LATENCY)
+        self._reply({
+            'model': body.get('model'),
+            'message': {'role': 'assistant', 'content': f"summary from port {self.server.server_port}"},
+            'done': True
+        })
+
+    def _reply(self, payload):
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stub():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubOllama)
+    server.slots = threading.Semaphore(STUB_SLOTS)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run(pool, label, during=None):
+    def one(i):
+        return pool.chat(model="stub", messages=[{"role": "user", "content": f"Summarize email {i}"}])
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(CONCURRENCY) as executor:
+        futures = [executor.submit(one, i) for i in range(REQUEST_COUNT)]
+        if during:
+            during()
+        failed = sum(1 for future in futures if future.exception())
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {REQUEST_COUNT / elapsed:6.1f} req/s  failed={failed}")
+    for host, status in pool.status().items():
+        print(f"    {host:<26} requests={status['requests']:<3} healthy={status['healthy']}")
+
+
+def main():
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    servers = [start_stub() for _ in range(NODE_COUNT)]
+    hosts = [f"http://127.0.0.1:{server.server_port}" for server in servers]
+
+    run(OllamaPool(hosts[:1]), "1 node")
+    run(OllamaPool(hosts), f"{NODE_COUNT} nodes")
+
+    def stop_first_node():
+        time.sleep(STUB_LATENCY * 2)
+        servers[0].shutdown()
+        servers[0].server_close()
+
+    run(OllamaPool(hosts), f"{NODE_COUNT} nodes, one stopped", during=stop_first_node)
+
+
+if __name__ == "__main__":
+    main()
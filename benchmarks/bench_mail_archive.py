@@ -0,0 +1,60 @@
+"""
+Time analytical queries over a synthetic 100k-message mail archive.
+
+Run from the repository root:
+    python -m benchmarks.bench_mail_archive
+"""
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+from src.email_record import EmailRecord
+from src.mail_archive import MailArchive
+
+MESSAGE_COUNT = 100_000
+SENDER_COUNT = 2_000
+DOMAIN_COUNT = 150
+
+
+def make_records(count):
+    """Yield synthetic records spread over the last year."""
+    rng = random.Random(0)
+    now = datetime.now()
+    for i in range(count):
+        sender = rng.randrange(SENDER_COUNT)
+        received = now - timedelta(seconds=rng.randrange(365 * 86_400))
+        yield EmailRecord(
+            id=f"msg{i:07d}",
+            thread_id=f"thr{i // 4:07d}",
+            internal_date=int(received.timestamp() * 1000),
+            subject=f"Update {i}",
+            sender=f"Sender {sender} <user{sender}@domain{sender % DOMAIN_COUNT}.com>",
+            received=received.isoformat(),
+            body=b"x" * rng.randrange(200, 2_000)
+        )
+
+
+def timed(label, func):
+    start = time.perf_counter()
+    result = func()
+    print(f"{label:<32} {(time.perf_counter() - start) * 1000:8.1f} ms")
+    return result
+
+
+def main():
+    with tempfile.TemporaryDirectory() as path:
+        archive = MailArchive(path)
+        timed(f"append {MESSAGE_COUNT} messages", lambda: archive.append(make_records(MESSAGE_COUNT)))
+
+        # A fresh instance reads everything back from disk
+        archive = MailArchive(path)
+        quarter_start = datetime.now() - timedelta(days=90)
+        timed("top senders (quarter)", lambda: archive.top_senders(quarter_start, None, 10))
+        timed("volume by domain (all)", lambda: archive.volume_by_domain(top_n=10))
+        timed("volume by day (quarter)", lambda: archive.volume_by_day(quarter_start))
+        timed("count for one sender", lambda: archive.count(sender="user7@domain7.com"))
+        timed("agent tool: top_senders", lambda: archive.mailbox_analytics("top_senders"))
+
+
+if __name__ == "__main__":
+    main()
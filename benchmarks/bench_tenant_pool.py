@@ -0,0 +1,130 @@
+"""
+Exercise the multi-tenant dispatcher against a local stand-in for the Google APIs.
+
+Every user gets fake OAuth tokens that are valid for an hour, so no refresh or
+consent flow runs. A stub HTTP server answers Calendar event listings after a
+fixed delay and names each event after the user whose bearer token asked for
+it, so answers leaking between users would show up as mismatches.
+
+A user's handlers run one full calendar sync when they are built and then
+serve from their event cache, so the number of full syncs the stub sees is
+the number of times handlers were built. The runs compare:
+- users pinned to workers with room for all of them (one build per user)
+- a per-worker cache too small for its users (LRU eviction rebuilds them)
+- a zero TTL (every request rebuilds)
+
+Run from the repository root:
+    python -m benchmarks.bench_tenant_pool
+"""
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+import zlib
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from src.tenant_pool import TenantDispatcher, GMAIL_SCOPES, CALENDAR_SCOPES
+
+WORKERS = 4
+USER_COUNT = 24
+REQUEST_COUNT = 240
+# Seconds the stub takes to answer an API call
+STUB_LATENCY = 0.02
+
+
+class StubGoogleApi(BaseHTTPRequestHandler):
+    def do_GET(self):
+        user_id = self.headers.get('Authorization', '').rpartition('fake-token-')[2]
+        if '/events' not in self.path:
+            self._reply(404, {'error': {'code': 404, 'message': 'not stubbed'}})
+            return
+        time.sleep(STUB_LATENCY)
+        with self.server.lock:
+            if 'syncToken=' not in self.path:
+                self.server.full_syncs[user_id] += 1
+        start = datetime.now(timezone.utc) + timedelta(hours=1)
+        self._reply(200, {
+            'items': [{
+                'id': f"evt{zlib.crc32(user_id.encode('utf-8'))}",
+                'status': 'confirmed',
+                'summary': f"standup of {user_id}",
+                'start': {'dateTime': start.isoformat()},
+                'end': {'dateTime': (start + timedelta(minutes=15)).isoformat()}
+            }],
+            'nextSyncToken': 'sync'
+        })
+
+    def _reply(self, status, payload):
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stub():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubGoogleApi)
+    server.lock = threading.Lock()
+    server.full_syncs = Counter()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def write_fake_tokens(token_dir, user_ids):
+    """Write token files that Credentials accepts as valid without a refresh."""
+    expiry = (datetime.now(timezone.utc) + timedelta(hours=1)).strftime("%Y-%m-%dT%H:%M:%SZ")
+    for user_id in user_ids:
+        os.makedirs(os.path.join(token_dir, user_id))
+        for filename, scopes in (('token.json', GMAIL_SCOPES), ('calendar_token.json', CALENDAR_SCOPES)):
+            with open(os.path.join(token_dir, user_id, filename), 'w') as token:
+                json.dump({
+                    'token': f"fake-token-{user_id}",
+                    'refresh_token': 'fake-refresh-token',
+                    'client_id': 'fake-client-id',
+                    'client_secret': 'fake-client-secret',
+                    'scopes': scopes,
+                    'expiry': expiry
+                }, token)
+
+
+def run(server, token_dir, user_ids, label, max_clients, ttl):
+    server.full_syncs.clear()
+    rng = random.Random(0)
+    requests = [rng.choice(user_ids) for _ in range(REQUEST_COUNT)]
+    with TenantDispatcher(workers=WORKERS, token_dir=token_dir, max_clients=max_clients, ttl=ttl,
+                          api_endpoint=f"http://127.0.0.1:{server.server_port}/") as dispatcher:
+        start = time.perf_counter()
+        futures = [(user_id, dispatcher.submit(user_id, 'get_upcoming_events')) for user_id in requests]
+        mismatched = sum(
+            1 for user_id, future in futures
+            if [event['summary'] for event in future.result()['items']] != [f"standup of {user_id}"]
+        )
+        elapsed = time.perf_counter() - start
+    print(f"{label:<34} {REQUEST_COUNT / elapsed:6.1f} req/s  "
+          f"full syncs={sum(server.full_syncs.values()):<4} wrong answers={mismatched}")
+
+
+def main():
+    user_ids = [f"user{i}@example.com" for i in range(USER_COUNT)]
+    per_worker = Counter(zlib.crc32(user_id.encode('utf-8')) % WORKERS for user_id in user_ids)
+    print(f"{USER_COUNT} users on {WORKERS} workers, {REQUEST_COUNT} requests; "
+          f"users per worker: {[per_worker[i] for i in range(WORKERS)]}")
+
+    server = start_stub()
+    with tempfile.TemporaryDirectory() as token_dir:
+        write_fake_tokens(token_dir, user_ids)
+        run(server, token_dir, user_ids, "pinned, cache fits all users", max_clients=USER_COUNT, ttl=1800)
+        run(server, token_dir, user_ids, "pinned, 2 users cached per worker", max_clients=2, ttl=1800)
+        run(server, token_dir, user_ids, "pinned, zero TTL", max_clients=USER_COUNT, ttl=0)
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
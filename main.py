@@ -1,11 +1,18 @@
 import streamlit as st
-from src.chat_interface import ChatInterface
+from src.chat_interface import ChatInterface, warm_up_models
 from src.reach_agent import ReActAssistant
 
+@st.cache_resource
+def warm_models():
+    """Warm the models once per server process; the interface itself is kept per session"""
+    return warm_up_models()
+
 def main():
-    # Initialize and run the chat interface
-    chat_interface = ChatInterface()
-    chat_interface.run()
+    warm_models()
+    # Each browser session gets its own agent memory and API clients
+    if "chat_interface" not in st.session_state:
+        st.session_state.chat_interface = ChatInterface(warm_up=False)
+    st.session_state.chat_interface.run()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
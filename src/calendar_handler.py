@@ -1,5 +1,6 @@
 import os
 import datetime
+import itertools
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
@@ -7,21 +8,51 @@ from googleapiclient.discovery import build
 from .logger import logger
 import json 
 # from config import OLLAMA_MODEL
-import ollama
+from .model_session import model_session
+from .tool_results import compact_page, encode_cursor, decode_cursor, DEFAULT_PAGE_SIZE
+from .event_cache import EventCache
 OLLAMA_MODEL = "gemma3:1b"
-OLLAMA_BASE_URL = "http://localhost:11434"
+
+# Kept byte-stable so Ollama can reuse the evaluated prompt prefix
+EVENT_PARSER_SYSTEM_PROMPT = """You are a calendar event parser. Extract event details from user input.
+Return a JSON with these fields:
+- title: Event title
+- start_time: Event start time (ISO format)
+- end_time: Event end time (ISO format)
+- description: Event description
+- location: Event location
+- attendees: List of attendee emails
+If any field is not mentioned, return null for that field.
+and do not write json keyword before the json object."""
+
+# Days ahead covered by get_upcoming_events
+UPCOMING_WINDOW_DAYS = 30
+# Largest window get_events_in_window will expand
+MAX_WINDOW_DAYS = 366
+
 class CalendarHandler:
-    def __init__(self):
+    def __init__(self, token_path='calendar_token.json', creds=None, api_endpoint=None):
+        """
+        Initialize CalendarHandler with Google Calendar API authentication.
+
+        Args:
+            token_path (str): File the user's OAuth token is read from and saved to
+            creds (Credentials): Ready-made credentials; skips the token file when given
+            api_endpoint (str): Optional Calendar API base URL, e.g. a local stand-in server
+        """
         self.SCOPES = ['https://www.googleapis.com/auth/calendar']
-        self.creds = None
+        self.token_path = token_path
+        self.api_endpoint = api_endpoint
+        self.creds = creds
         self.service = None
         self.initialize_calendar()
+        self.event_cache = EventCache(self.service)
 
     def initialize_calendar(self):
         """Initialize Google Calendar API service"""
-        # Check if token.json exists
-        if os.path.exists('calendar_token.json'):
-            self.creds = Credentials.from_authorized_user_file('', self.SCOPES) #Provide you cred json
+        # Check if the token file exists
+        if self.creds is None and os.path.exists(self.token_path):
+            self.creds = Credentials.from_authorized_user_file(self.token_path, self.SCOPES)
         
         # If credentials are not valid or don't exist, get new ones
         if not self.creds or not self.creds.valid:
@@ -33,10 +64,11 @@ class CalendarHandler:
                 self.creds = flow.run_local_server(port=0)
             
             # Save the credentials for the next run
-            with open('calendar_token.json', 'w') as token:
+            with open(self.token_path, 'w') as token:
                 token.write(self.creds.to_json())
 
-        self.service = build('calendar', 'v3', credentials=self.creds)
+        client_options = {'api_endpoint': self.api_endpoint} if self.api_endpoint else None
+        self.service = build('calendar', 'v3', credentials=self.creds, client_options=client_options)
 
     def create_event(self, title, start_time, end_time, description="", location="", attendees=None):
         """Create a new calendar event"""
@@ -63,6 +95,7 @@ class CalendarHandler:
                 body=event,
                 sendUpdates='all'  # Send email notifications to attendees
             ).execute()
+            self.event_cache.invalidate()
 
             return {
                 'status': 'success',
@@ -76,43 +109,87 @@ class CalendarHandler:
                 'message': str(e)
             }
 
-    def get_upcoming_events(self, max_results=10):
-        """Get upcoming calendar events"""
+    def get_upcoming_events(self, max_results: int = 10, cursor: str = None):
+        """
+        Get upcoming calendar events as compact records.
+
+        Recurring events are listed once, at their next occurrence, so a daily
+        meeting does not crowd out everything else.
+
+        Args:
+            max_results (int): Number of events to return
+            cursor (str): The next_cursor value from a previous call to get the next page.
+                          Leave empty for the first page.
+
+        Returns:
+            dict: Dictionary with items (each with id, summary, start, end and optionally
+                  location, attendees and recurrence), returned and next_cursor
+        """
         try:
-            now = datetime.datetime.utcnow().isoformat() + 'Z'
-            events_result = self.service.events().list(
-                calendarId='primary',
-                timeMin=now,
-                maxResults=max_results,
-                singleEvents=True,
-                orderBy='startTime'
-            ).execute()
-            
-            events = events_result.get('items', [])
-            return events
+            now = datetime.datetime.now(datetime.timezone.utc)
+            events = self.event_cache.iter_events(
+                now, now + datetime.timedelta(days=UPCOMING_WINDOW_DAYS), collapse_recurring=True
+            )
+            return self._event_page(events, max_results, cursor, "get_upcoming_events")
 
         except Exception as e:
             print(f"Error fetching events: {str(e)}")
-            return []
+            return compact_page([], name="get_upcoming_events")
+
+    def get_events_in_window(self, start_date: str, end_date: str, max_results: int = 50, cursor: str = None):
+        """
+        Get every calendar event between two dates, with recurring events expanded.
+
+        Args:
+            start_date (str): First day of the window in YYYY-MM-DD format
+            end_date (str): Last day of the window in YYYY-MM-DD format (inclusive)
+            max_results (int): Number of events to return
+            cursor (str): The next_cursor value from a previous call to get the next page.
+                          Leave empty for the first page.
+
+        Returns:
+            dict: Dictionary with items (each with id, summary, start, end and optionally
+                  location, attendees and recurrence), returned and next_cursor
+        """
+        try:
+            local_tz = datetime.datetime.now().astimezone().tzinfo
+            start = datetime.datetime.strptime(start_date, "%Y-%m-%d").replace(tzinfo=local_tz)
+            end = datetime.datetime.strptime(end_date, "%Y-%m-%d").replace(tzinfo=local_tz)
+            end += datetime.timedelta(days=1)
+            if end <= start:
+                raise ValueError("end_date must not be before start_date")
+            if end - start > datetime.timedelta(days=MAX_WINDOW_DAYS):
+                raise ValueError(f"Window is longer than {MAX_WINDOW_DAYS} days")
+
+            events = self.event_cache.iter_events(start, end)
+            return self._event_page(events, max_results, cursor, "get_events_in_window")
+
+        except Exception as e:
+            logger.error(f"Error fetching events in window: {str(e)}")
+            return {"error": f"Error fetching events in window: {str(e)}"}
+
+    def _event_page(self, events, max_results, cursor, name):
+        """
+        Take one page from a lazily generated event stream.
+
+        Only the events up to the end of the requested page are generated; one
+        extra event is peeked to decide whether there is a next page.
+        """
+        offset = decode_cursor(cursor)
+        page_size = max(1, max_results or DEFAULT_PAGE_SIZE)
+        page = list(itertools.islice(events, offset, offset + page_size + 1))
+        next_cursor = encode_cursor(offset + page_size) if len(page) > page_size else None
+        return compact_page(page[:page_size], next_cursor=next_cursor, name=name, offset=offset)
 
     def parse_event_details(self, user_input):
         """Parse event details from user input using Ollama"""
         try:
-            response = ollama.chat(
+            response = model_session.chat(
                 model=OLLAMA_MODEL,
                 messages=[
                     {
                         "role": "system",
-                        "content": """You are a calendar event parser. Extract event details from user input.
-                        Return a JSON with these fields:
-                        - title: Event title
-                        - start_time: Event start time (ISO format)
-                        - end_time: Event end time (ISO format)
-                        - description: Event description
-                        - location: Event location
-                        - attendees: List of attendee emails
-                        If any field is not mentioned, return null for that field.
-                        and do not write json keyword before the json object."""
+                        "content": EVENT_PARSER_SYSTEM_PROMPT
                     },
                     {
                         "role": "user",
@@ -1,24 +1,45 @@
 import streamlit as st
-import ollama
 from datetime import datetime
 from .email_handler import EmailHandler
 from .calendar_handler import CalendarHandler
 from .logger import logger
-from .reach_agent import ReActAssistant
+from .reach_agent import ReActAssistant, AGENT_MODEL, AGENT_SYSTEM_PROMPT
+from .email_handler import SUMMARY_SYSTEM_PROMPT
+from .model_session import model_session
+from .prefetch_worker import PrefetchWorker
 import warnings
 warnings.filterwarnings('ignore')
 # from src.my_config import OLLAMA_MODEL
 
 OLLAMA_MODEL = "gemma3:1b"
-OLLAMA_BASE_URL = "http://localhost:11434"
 # Initialize session state using setdefault
 
+def warm_up_models():
+    """Load both models up front and prime their static system prompts"""
+    return model_session.warm_up({
+        OLLAMA_MODEL: SUMMARY_SYSTEM_PROMPT,
+        AGENT_MODEL: AGENT_SYSTEM_PROMPT
+    })
+
 class ChatInterface:
-    def __init__(self):
+    def __init__(self, warm_up=True, prefetch=False):
         self.email_handler = EmailHandler()
         self.calendar_handler = CalendarHandler()
         self.ollama_model = OLLAMA_MODEL
         self.react_agent = ReActAssistant()
+        if warm_up:
+            warm_up_models()
+        self.prefetch_worker = None
+        if prefetch:
+            # Summarize new mail in the background into the agent's summary store
+            self.prefetch_worker = PrefetchWorker(self.react_agent.email_handler.summary_store)
+            self.prefetch_worker.start()
+
+    def close(self):
+        """Stop background work started by the interface"""
+        if self.prefetch_worker:
+            self.prefetch_worker.stop(timeout=30)
+            self.prefetch_worker = None
 
     def process_user_input(self, user_input):
         """Process user input and determine intent"""
@@ -0,0 +1,203 @@
+import re
+from collections import deque
+from .logger import logger
+from .model_session import model_session
+
+OLLAMA_MODEL = "gemma3:1b"
+
+# Token budget for everything the memory hands back to the agent each turn
+MEMORY_MAX_TOKENS = 1500
+# Once over budget, turns are compacted until the memory is down to this share of it
+COMPACTION_TARGET_RATIO = 0.5
+# Upper bound for the rolling summary of compacted turns
+SUMMARY_MAX_TOKENS = 400
+# Number of most recent turns that are always kept verbatim
+MIN_RECENT_TURNS = 2
+# Tool outputs are clipped to this many characters before they are stored
+TOOL_OUTPUT_MAX_CHARS = 800
+
+COMPACTION_SYSTEM_PROMPT = """You maintain the running memory of a conversation between a user and an email and calendar assistant.
+Merge the previous summary with the new conversation turns into one short summary.
+Keep names, email addresses, subjects, dates, times and any pending requests.
+Drop greetings, formatting and anything already resolved."""
+
+
+def estimate_tokens(text):
+    """
+    Roughly estimate the number of tokens in a piece of text.
+
+    Args:
+        text (str): Text to measure
+
+    Returns:
+        int: Approximate token count (about four characters per token)
+    """
+    return len(text) // 4 + 1
+
+
+def strip_thinking(text):
+    """
+    Remove <think>...</think> blocks emitted by reasoning models.
+
+    Args:
+        text (str): Model output
+
+    Returns:
+        str: Output without the reasoning section
+    """
+    return re.sub(r"<think>.*?</think>", "", text or "", flags=re.DOTALL).strip()
+
+
+class ConversationMemory:
+    """
+    Bounded session memory for the ReAct agent.
+
+    Recent turns are kept verbatim. When the memory grows past its token budget,
+    the oldest turns (including their tool outputs) are folded into a rolling
+    summary, so the context handed to the agent stays roughly constant in size
+    no matter how long the session runs. Compaction frees room down to a
+    low-water mark below the budget, so it runs every few turns rather than on
+    every turn once the budget is reached.
+
+    Attributes:
+        max_tokens (int): Token budget for summary plus recent turns
+        target_tokens (int): Low-water mark compaction brings the memory down to
+        summary_max_tokens (int): Token budget for the rolling summary
+        min_recent_turns (int): Turns that are never compacted
+        tool_output_max_chars (int): Clip length for stored tool outputs
+        summary (str): Rolling summary of compacted turns
+    """
+
+    def __init__(self, max_tokens=MEMORY_MAX_TOKENS, summary_max_tokens=SUMMARY_MAX_TOKENS,
+                 min_recent_turns=MIN_RECENT_TURNS, tool_output_max_chars=TOOL_OUTPUT_MAX_CHARS,
+                 summarizer=None, target_ratio=COMPACTION_TARGET_RATIO):
+        """
+        Initialize an empty conversation memory.
+
+        Args:
+            max_tokens (int): Token budget for summary plus recent turns
+            summary_max_tokens (int): Token budget for the rolling summary
+            min_recent_turns (int): Number of recent turns always kept verbatim
+            tool_output_max_chars (int): Clip length for stored tool outputs
+            summarizer (callable): Optional function (text, max_tokens) -> summary.
+                Defaults to summarizing with the local Ollama model.
+            target_ratio (float): Share of max_tokens that compaction brings the memory down to
+        """
+        self.max_tokens = max_tokens
+        self.target_tokens = int(max_tokens * target_ratio)
+        self.summary_max_tokens = summary_max_tokens
+        self.min_recent_turns = min_recent_turns
+        self.tool_output_max_chars = tool_output_max_chars
+        self.summarizer = summarizer or self._summarize_with_model
+        self.summary = ""
+        self._turns = deque()
+
+    def add_turn(self, user_input, response, tool_outputs=None):
+        """
+        Record a completed turn and compact older turns if over budget.
+
+        Args:
+            user_input (str): The user's message
+            response (str): The assistant's final response
+            tool_outputs (list): Optional list of (tool_name, output) tuples
+        """
+        tools = []
+        for name, output in tool_outputs or []:
+            output = str(output)
+            if len(output) > self.tool_output_max_chars:
+                output = output[:self.tool_output_max_chars] + " ...[truncated]"
+            tools.append((name, output))
+
+        self._turns.append({
+            "user": user_input,
+            "assistant": strip_thinking(response),
+            "tools": tools
+        })
+
+        if self.token_count() <= self.max_tokens:
+            return
+        evicted = []
+        while len(self._turns) > self.min_recent_turns and self.token_count() > self.target_tokens:
+            evicted.append(self._turns.popleft())
+        if evicted:
+            self._compact(evicted)
+
+    def context_messages(self):
+        """
+        Build the message list to prepend to the next agent request.
+
+        Returns:
+            list: Chat messages (dicts with role and content) holding the rolling
+                  summary followed by the recent turns
+        """
+        messages = []
+        if self.summary:
+            messages.append({
+                "role": "system",
+                "content": f"Summary of the earlier conversation:\n{self.summary}"
+            })
+        for turn in self._turns:
+            messages.append({"role": "user", "content": turn["user"]})
+            messages.append({"role": "assistant", "content": self._render_assistant(turn)})
+        return messages
+
+    def token_count(self):
+        """
+        Estimate the tokens the memory currently contributes to the prompt.
+
+        Returns:
+            int: Approximate token count of summary and recent turns
+        """
+        total = estimate_tokens(self.summary) if self.summary else 0
+        for turn in self._turns:
+            total += estimate_tokens(turn["user"]) + estimate_tokens(self._render_assistant(turn))
+        return total
+
+    def clear(self):
+        """Forget the summary and all recorded turns."""
+        self.summary = ""
+        self._turns.clear()
+
+    def _render_assistant(self, turn):
+        """Render an assistant turn together with the tool outputs it used."""
+        if not turn["tools"]:
+            return turn["assistant"]
+        tool_lines = "\n".join(f"[{name} result] {output}" for name, output in turn["tools"])
+        return f"{tool_lines}\n{turn['assistant']}"
+
+    def _compact(self, turns):
+        """
+        Fold evicted turns into the rolling summary.
+
+        Args:
+            turns (list): Turns removed from the verbatim window, oldest first
+        """
+        transcript = "\n".join(
+            f"User: {turn['user']}\nAssistant: {self._render_assistant(turn)}" for turn in turns
+        )
+        text = f"Previous summary:\n{self.summary or '(none)'}\n\nNew turns:\n{transcript}"
+        try:
+            summary = self.summarizer(text, self.summary_max_tokens)
+        except Exception as e:
+            logger.error(f"Error compacting conversation memory: {str(e)}")
+            summary = f"{self.summary}\n{transcript}"
+
+        summary = strip_thinking(summary)
+        max_chars = self.summary_max_tokens * 4
+        if len(summary) > max_chars:
+            # Keep the most recent part of the summary when it is still too long
+            summary = summary[-max_chars:]
+        self.summary = summary
+        logger.info(f"Compacted {len(turns)} turn(s); memory now ~{self.token_count()} tokens")
+
+    def _summarize_with_model(self, text, max_tokens):
+        """Summarize text with the local Ollama model."""
+        response = model_session.chat(
+            model=OLLAMA_MODEL,
+            messages=[
+                {"role": "system", "content": COMPACTION_SYSTEM_PROMPT},
+                {"role": "user", "content": text}
+            ],
+            options={"num_predict": max_tokens}
+        )
+        return response['message']['content']
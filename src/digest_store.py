@@ -0,0 +1,78 @@
+import os
+import json
+import hashlib
+import threading
+
+DIGEST_DIR = "digests"
+
+
+def fingerprint(values):
+    """
+    Build an order-independent fingerprint of a collection of strings.
+
+    Args:
+        values (iterable): Strings such as message ids or day fingerprints
+
+    Returns:
+        str: Hex digest identifying the collection
+    """
+    return hashlib.sha1("\n".join(sorted(values)).encode('utf-8')).hexdigest()
+
+
+class DigestStore:
+    """
+    On-disk store of materialized email digests.
+
+    Daily digests are keyed by day and carry a fingerprint of the message ids they
+    were built from. Rollups (weeks, months, arbitrary ranges) carry a fingerprint
+    of the daily fingerprints they merge, so a rollup is only rebuilt when one of
+    its days changed.
+
+    Attributes:
+        path (str): Directory holding the digest files
+    """
+
+    def __init__(self, path=DIGEST_DIR):
+        """
+        Initialize the store.
+
+        Args:
+            path (str): Directory holding the digest files
+        """
+        self.path = path
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Read a stored digest.
+
+        Args:
+            key (str): Digest key, e.g. day-2025-05-25 or week-2025-W21
+
+        Returns:
+            dict: Stored digest, or None if missing
+        """
+        path = self._file(key)
+        with self._lock:
+            if not os.path.exists(path):
+                return None
+            with open(path) as f:
+                return json.load(f)
+
+    def put(self, key, digest):
+        """
+        Store a digest, replacing any previous version atomically.
+
+        Args:
+            key (str): Digest key
+            digest (dict): Digest to store
+        """
+        path = self._file(key)
+        with self._lock:
+            os.makedirs(self.path, exist_ok=True)
+            with open(f"{path}.tmp", 'w') as f:
+                json.dump(digest, f)
+            os.replace(f"{path}.tmp", path)
+
+    def _file(self, key):
+        return os.path.join(self.path, f"{key}.json")
@@ -1,19 +1,144 @@
 import os
+import re
+import time
 import base64
-import ollama
+import threading
+import httplib2
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
+from google_auth_httplib2 import AuthorizedHttp
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+from email.utils import getaddresses, parseaddr
 from .logger import logger
+from .model_session import model_session
+from .summary_store import SummaryStore
+from .email_record import EmailRecord
+from .mail_archive import MailArchive, MAIL_ARCHIVE_DIR
+from .digest_store import DigestStore, DIGEST_DIR, fingerprint
+from .triage import BULK_PRECEDENCE, PRIORITIES, deadline_mentions, triage_score
+from .tool_results import (
+    DEFAULT_PAGE_SIZE, EMAIL_FIELDS, compact_page, decode_cursor, encode_cursor, project
+)
 #from my_config import MAX_EMAILS_TO_FETCH, EMAIL_SUMMARY_MAX_LENGTH, OLLAMA_MODEL
 MAX_EMAILS_TO_FETCH = 10
 EMAIL_SUMMARY_MAX_LENGTH = 200 
 OLLAMA_MODEL = "gemma3:1b"
-OLLAMA_BASE_URL = "http://localhost:11434"
+# Bulk sending limits
+BULK_REWRITE_WORKERS = 4
+BULK_SEND_WORKERS = 5
+BULK_SENDS_PER_SECOND = 5
+# Retries of a send rejected with 429; other failures may have sent the mail and are not retried
+SEND_RETRIES = 2
+SEND_RETRY_BACKOFF_SECONDS = 1
+PLACEHOLDER_PATTERN = re.compile(r"\{(\w+)\}")
+# Archive exports fetch up to this many messages and append them in batches
+MAX_ARCHIVE_FETCH = 100_000
+# Write every fetched message through to the local mail archive
+ARCHIVE_FETCHED_MAIL = True
+ARCHIVE_BATCH_SIZE = 500
+# Digests summarize at most this many messages per day
+MAX_DIGEST_MESSAGES_PER_DAY = 50
+NO_MAIL_DIGEST = "No emails."
+# Largest page the Gmail list endpoint returns
+MAX_LIST_PAGE_SIZE = 500
+
+# Model summaries per process_todays_emails call; other mail gets a metadata-only line
+LLM_BUDGET_PER_REQUEST = 3
+# Today's messages ranked by triage; far more than MAX_EMAILS_TO_FETCH since triage needs no model
+MAX_TRIAGE_MESSAGES = 200
+# Metadata requests sent per Gmail batch request when triaging uncached messages
+TRIAGE_BATCH_SIZE = 50
+# Characters of Gmail's snippet kept in a metadata-only line
+TRIAGE_SNIPPET_CHARS = 120
+TRIAGE_HEADERS = ['Subject', 'From', 'Date', 'To', 'Cc', 'List-Unsubscribe', 'Precedence']
+TRIAGE_FIELDS = "id,threadId,internalDate,snippet,payload/headers"
+# Threads the user wrote in recently; replies in them count as replies to the user
+SENT_HISTORY_QUERY = "in:sent newer_than:14d"
+MAX_SENT_HISTORY = 500
+SENT_HISTORY_TTL_SECONDS = 600
+# Look-back window of the archive when checking whether a sender wrote before today
+SENDER_HISTORY_DAYS = 90
+# Request only the fields and MIME parts that are actually used
+LEAN_FETCH = True
+
+
+def _parts_mask(depth):
+    """Build a fields mask for a MIME part tree without part headers."""
+    mask = "partId,mimeType,filename,body(data,attachmentId)"
+    if depth:
+        mask += f",parts({_parts_mask(depth - 1)})"
+    return mask
+
+
+def _has_truncated_parts(payload):
+    """Whether a part tree fetched with the fields mask has multiparts cut off below the mask depth."""
+    stack = [payload]
+    while stack:
+        part = stack.pop()
+        if part.get('parts'):
+            stack.extend(part['parts'])
+        elif part.get('mimeType', '').startswith('multipart/'):
+            return True
+    return False
+
+
+# MIME nesting depth covered by the message fields mask; deeper messages are refetched without it
+MESSAGE_PARTS_DEPTH = 5
+# Partial-response masks for the Gmail API
+LIST_FIELDS = "messages(id,threadId),nextPageToken"
+MESSAGE_FIELDS = f"id,threadId,internalDate,payload(headers,{_parts_mask(MESSAGE_PARTS_DEPTH)})"
+
+# Thread summaries only carry this much quoted history for a thread seen for the first time
+THREAD_CONTEXT_MAX_CHARS = 4000
+THREAD_FIELDS = ('thread_id', 'subject', 'participants', 'messages', 'summary')
+# Lines that start the quoted part of a reply ("On Mon, ... wrote:", Outlook headers)
+QUOTE_HEADER_PATTERN = re.compile(
+    r"^(On .+wrote:|-+ ?Original Message ?-+|From: .+\n(?:Sent|Date): .+)\s*$", re.MULTILINE
+)
+
+# System prompts are kept byte-stable so Ollama can reuse the evaluated prefix
+SUMMARY_SYSTEM_PROMPT = ("You are an email summarization assistant. Provide concise summaries of emails, "
+                         f"in complete sentences and under {EMAIL_SUMMARY_MAX_LENGTH} characters.")
+# Guard against runaway summaries, well above the length the prompt asks for
+SUMMARY_MAX_TOKENS = EMAIL_SUMMARY_MAX_LENGTH // 2
+EMAIL_REWRITE_SYSTEM_PROMPT = """You are an email writing assistant. Your task is to improve the given email content while maintaining its core message.
+Guidelines:
+1. Keep it professional and courteous
+2. Maintain clear and concise language
+3. Use proper grammar and punctuation
+4. Structure the content logically
+5. Keep the original intent and tone
+6. Add appropriate greetings and closings if missing
+7. Format paragraphs properly
+8. Remove any inappropriate or unprofessional content"""
+DIGEST_SYSTEM_PROMPT = """You write email digests.
+Merge the given summaries into one concise digest. Group related items, keep senders, decisions, action items and deadlines, and drop duplicates.
+Return only the digest."""
+THREAD_SUMMARY_SYSTEM_PROMPT = """You maintain running summaries of email conversations.
+Update the previous summary with the new messages. Keep who asked for what, decisions, open questions and deadlines.
+Return only the updated summary."""
+
+
+def strip_quoted_text(body):
+    """
+    Remove the quoted history from a reply.
+
+    Args:
+        body (str): Plain-text email body
+
+    Returns:
+        str: Body without '>' quoted lines and without anything after a reply header
+    """
+    match = QUOTE_HEADER_PATTERN.search(body)
+    if match:
+        body = body[:match.start()]
+    return "\n".join(line for line in body.splitlines() if not line.lstrip().startswith('>')).strip()
 
 
 class EmailHandler:
@@ -32,16 +157,38 @@ class EmailHandler:
         creds (Credentials): Google API credentials
         service: Gmail API service instance
         promotional_indicators (list): Keywords used to identify promotional emails
+        llm_budget (int): Default number of model summaries per process_todays_emails call
     """
 
-    def __init__(self):
+    def __init__(self, token_path='token.json', creds=None, api_endpoint=None,
+                 archive_dir=MAIL_ARCHIVE_DIR, digest_dir=DIGEST_DIR):
         """
         Initialize EmailHandler with Gmail API authentication and promotional email indicators.
+
+        Args:
+            token_path (str): File the user's OAuth token is read from and saved to
+            creds (Credentials): Ready-made credentials; skips the token file when given
+            api_endpoint (str): Optional Gmail API base URL, e.g. a local stand-in server
+            archive_dir (str): Directory of the local mail archive used for analytics
+            digest_dir (str): Directory of the stored daily and rollup digests
         """
         self.SCOPES = ['https://www.googleapis.com/auth/gmail.readonly' , 
                        "https://www.googleapis.com/auth/gmail.send"]
-        self.creds = None
+        self.token_path = token_path
+        self.api_endpoint = api_endpoint
+        self.creds = creds
         self.service = None
+        self.summary_store = SummaryStore()
+        self.thread_store = SummaryStore()
+        self.archive = MailArchive(archive_dir)
+        self.digest_store = DigestStore(digest_dir)
+        self.lean_fetch = LEAN_FETCH
+        self.archive_fetched = ARCHIVE_FETCHED_MAIL
+        self.fetch_stats = {'messages': 0, 'bytes': 0}
+        self.triage_store = SummaryStore()
+        self.llm_budget = LLM_BUDGET_PER_REQUEST
+        self._my_address = None
+        self._sent_threads = None
         self.initialize_gmail()
         self.promotional_indicators = [
             'unsubscribe',
@@ -89,7 +236,7 @@ class EmailHandler:
         Initialize Gmail API service and handle authentication.
         
         This method:
-        1. Checks for existing credentials in token.json
+        1. Uses credentials passed to the constructor, or loads them from token_path
         2. Refreshes expired credentials if possible
         3. Creates new credentials if none exist
         4. Builds the Gmail API service
@@ -97,9 +244,9 @@ class EmailHandler:
         Raises:
             Exception: If authentication or service initialization fails
         """
-        # Check if token.json exists
-        if os.path.exists('token.json'):
-            self.creds = Credentials.from_authorized_user_file('token.json', self.SCOPES)
+        # Check if the token file exists
+        if self.creds is None and os.path.exists(self.token_path):
+            self.creds = Credentials.from_authorized_user_file(self.token_path, self.SCOPES)
         
         # If credentials are not valid or don't exist, get new ones
         if not self.creds or not self.creds.valid:
@@ -111,67 +258,26 @@ class EmailHandler:
                 self.creds = flow.run_local_server(port=0)
             
             # Save the credentials for the next run
-            with open('token.json', 'w') as token:
+            with open(self.token_path, 'w') as token:
                 token.write(self.creds.to_json())
 
-        self.service = build('gmail', 'v1', credentials=self.creds)
+        client_options = {'api_endpoint': self.api_endpoint} if self.api_endpoint else None
+        self.service = build('gmail', 'v1', credentials=self.creds, client_options=client_options)
 
     def get_todays_emails(self):
         """
         Fetch today's emails, excluding promotional, social, and update categories.
 
         Returns:
-            list: List of dictionaries containing email data (subject, sender, date, body)
+            list: List of dictionaries containing email data (id, subject, sender, date, body)
 
         Raises:
             RuntimeError: If there's an error fetching emails
         """
         try:
-            # Calculate today's date range
-            today = datetime.now()
-            start_of_day = today.replace(hour=0, minute=0, second=0, microsecond=0)
-            
-            # Format date for Gmail API
-            date_str = start_of_day.strftime("%Y/%m/%d")
-            
-            # Search for today's emails
-            query = f'after:{date_str} -category:promotions -category:social -category:updates'
-            results = self.service.users().messages().list(
-                userId='me',
-                q=query,
-                maxResults=MAX_EMAILS_TO_FETCH
-            ).execute()
-
-            messages = results.get('messages', [])
             emails = []
-
-            for message in messages:
-                msg = self.service.users().messages().get(
-                    userId='me',
-                    id=message['id'],
-                    format='full'
-                ).execute()
-
-                # Get email details
-                headers = msg['payload']['headers']
-                subject = next(h['value'] for h in headers if h['name'] == 'Subject')
-                sender = next(h['value'] for h in headers if h['name'] == 'From')
-                date = next(h['value'] for h in headers if h['name'] == 'Date')
-
-                # Get email body
-                if 'parts' in msg['payload']:
-                    body = self._get_email_body(msg['payload']['parts'])
-                else:
-                    body = base64.urlsafe_b64decode(
-                        msg['payload']['body']['data']
-                    ).decode('utf-8')
-
-                email_data = {
-                    'subject': subject,
-                    'from': sender,
-                    'received': date,
-                    'body': body
-                }
+            for message_id in self._list_message_ids(self._todays_query()):
+                email_data = self._fetch_email(message_id)
                 #Commented to read all the emails
                 # if not self.is_promotional_email(email_data):
                 #     emails.append(email_data)
@@ -182,25 +288,221 @@ class EmailHandler:
             #logger.error(f"Error fetching emails: {str(e)}")
             raise RuntimeError(f"Error fetching emails: {str(e)}")
 
-    def _get_email_body(self, parts):
+    def _todays_query(self):
+        """
+        Build the Gmail search query for today's emails.
+
+        Returns:
+            str: Gmail search query
+        """
+        # Calculate today's date range
+        today = datetime.now()
+        start_of_day = today.replace(hour=0, minute=0, second=0, microsecond=0)
+
+        # Format date for Gmail API
+        date_str = start_of_day.strftime("%Y/%m/%d")
+        return f'after:{date_str} -category:promotions -category:social -category:updates'
+
+    def _list_message_ids(self, query, max_results=MAX_EMAILS_TO_FETCH):
         """
-        Extract email body from message parts recursively.
+        List the ids of messages matching a Gmail search query.
 
         Args:
-            parts (list): List of message parts from Gmail API
+            query (str): Gmail search query
+            max_results (int): Maximum number of ids to return
+
+        Returns:
+            list: Message ids, newest first
+        """
+        return [message['id'] for message in self._list_messages(query, max_results)]
+
+    def _list_messages(self, query, max_results=MAX_EMAILS_TO_FETCH):
+        """
+        List messages matching a Gmail search query, following result pages.
+
+        Args:
+            query (str): Gmail search query
+            max_results (int): Maximum number of messages to return
+
+        Returns:
+            list: Dictionaries with id and threadId, newest first
+        """
+        messages = []
+        page_token = None
+        while len(messages) < max_results:
+            results = self._execute(self.service.users().messages().list(
+                userId='me',
+                q=query,
+                maxResults=min(max_results - len(messages), MAX_LIST_PAGE_SIZE),
+                pageToken=page_token,
+                fields=LIST_FIELDS
+            ))
+            messages.extend(results.get('messages', []))
+            page_token = results.get('nextPageToken')
+            if not page_token:
+                break
+        return messages
+
+    def _fetch_email(self, message_id):
+        """
+        Fetch a single message and extract its headers and plain-text body.
+
+        Args:
+            message_id (str): Gmail message id
+
+        Returns:
+            dict: Email data with id, thread_id, internal_date, subject, from, received and body
+        """
+        return self._fetch_record(message_id).to_dict()
+
+    def _fetch_record(self, message_id, archive=True):
+        """
+        Fetch a single message as a compact EmailRecord.
+
+        In lean mode the request carries a fields mask that drops part headers,
+        and text/plain bodies too large to be inlined are fetched on their own.
+        A message nested deeper than the mask covers is fetched again without it.
+        Parts with a filename (attachments) are never downloaded. The body is kept
+        as bytes until the record's body is read. Fetched messages are written
+        through to the local mail archive, which feeds mailbox analytics and the
+        sender history used in triage.
+
+        Args:
+            message_id (str): Gmail message id
+            archive (bool): Append the record to the mail archive
+
+        Returns:
+            EmailRecord: Record with headers and the plain-text body bytes
+        """
+        request_args = {'userId': 'me', 'id': message_id, 'format': 'full'}
+        if self.lean_fetch:
+            request_args['fields'] = MESSAGE_FIELDS
+        msg = self._execute(self.service.users().messages().get(**request_args))
+        if self.lean_fetch and _has_truncated_parts(msg['payload']):
+            logger.info(f"Email {message_id} nests MIME parts deeper than the fields mask; refetching it in full")
+            msg = self._execute(self.service.users().messages().get(userId='me', id=message_id, format='full'))
+        self.fetch_stats['messages'] += 1
+
+        # Get email details
+        headers = {h['name']: h['value'] for h in msg['payload'].get('headers', [])}
+        record = EmailRecord(
+            id=message_id,
+            thread_id=msg.get('threadId'),
+            internal_date=int(msg.get('internalDate', 0)),
+            subject=headers.get('Subject', ''),
+            sender=headers.get('From', ''),
+            received=headers.get('Date', ''),
+            body=self._get_body_bytes(message_id, msg['payload'])
+        )
+        if archive and self.archive_fetched:
+            try:
+                self.archive.append([record])
+            except Exception as e:
+                logger.error(f"Error archiving email {message_id}: {str(e)}")
+        return record
+
+    def iter_email_records(self, query, max_results=MAX_EMAILS_TO_FETCH, archive=True):
+        """
+        Fetch the messages matching a query one at a time.
+
+        Only one raw API response is alive at a time, and each message is kept
+        as a compact EmailRecord, so large result sets stay small in memory.
+
+        Args:
+            query (str): Gmail search query
+            max_results (int): Maximum number of messages to fetch
+            archive (bool): Append each record to the mail archive as it is fetched
+
+        Yields:
+            EmailRecord: One record per message, newest first
+        """
+        for message in self._list_messages(query, max_results):
+            yield self._fetch_record(message['id'], archive=archive)
+
+    def _get_body_bytes(self, message_id, payload):
+        """
+        Collect the text/plain parts of a message payload as raw bytes.
+
+        The part tree is walked iteratively and the decoded parts are joined once,
+        so deeply nested multiparts do not cause repeated string concatenation.
+
+        Args:
+            message_id (str): Gmail message id, used to fetch bodies not inlined
+            payload (dict): Message payload from Gmail API
+
+        Returns:
+            bytes: Body parts in document order
+        """
+        chunks = []
+        stack = [payload]
+        while stack:
+            part = stack.pop()
+            if part.get('parts'):
+                # Push in reverse so parts are visited in document order
+                stack.extend(reversed(part['parts']))
+                continue
+            # Attachments are skipped; a single-part message is otherwise decoded whatever its type
+            if part.get('filename') or (part is not payload and part.get('mimeType') != 'text/plain'):
+                continue
+            data = part.get('body', {}).get('data')
+            attachment_id = part.get('body', {}).get('attachmentId')
+            if data is None and attachment_id:
+                data = self._execute(self.service.users().messages().attachments().get(
+                    userId='me',
+                    messageId=message_id,
+                    id=attachment_id,
+                    fields='data'
+                )).get('data')
+            if data:
+                chunks.append(base64.urlsafe_b64decode(data))
+        return b"".join(chunks)
+
+    def _execute(self, request):
+        """
+        Execute a Gmail API request and count the response bytes received.
+
+        Args:
+            request: googleapiclient HttpRequest
+
+        Returns:
+            dict: Deserialized response
+        """
+        return self._count_bytes(request).execute()
+
+    def _count_bytes(self, request):
+        """
+        Make a Gmail API request add its response bytes to fetch_stats when it completes.
+
+        Works for requests executed on their own and for requests added to a batch.
+
+        Args:
+            request: googleapiclient HttpRequest
+
+        Returns:
+            The same request
+        """
+        postproc = request.postproc
+
+        def count_bytes(resp, content):
+            self.fetch_stats['bytes'] += len(content)
+            return postproc(resp, content)
+
+        request.postproc = count_bytes
+        return request
+
+    def fetch_report(self):
+        """
+        Report how much data has been transferred for fetched messages.
 
         Returns:
-            str: Decoded email body text
+            dict: Dictionary with messages, bytes and bytes_per_message
         """
-        body = ""
-        for part in parts:
-            if part['mimeType'] == 'text/plain':
-                body += base64.urlsafe_b64decode(
-                    part['body']['data']
-                ).decode('utf-8')
-            elif 'parts' in part:
-                body += self._get_email_body(part['parts'])
-        return body
+        messages = self.fetch_stats['messages']
+        return {
+            'messages': messages,
+            'bytes': self.fetch_stats['bytes'],
+            'bytes_per_message': self.fetch_stats['bytes'] // messages if messages else 0
+        }
 
     def summarize_email(self, email_content):
         """
@@ -216,53 +518,386 @@ class EmailHandler:
             RuntimeError: If there's an error during summarization
         """
         try:
-            response = ollama.chat(
+            response = model_session.chat(
                 model=OLLAMA_MODEL,
                 messages=[
-                    {"role": "system", "content": "You are an email summarization assistant. Provide concise summaries of emails."},
+                    {"role": "system", "content": SUMMARY_SYSTEM_PROMPT},
                     {"role": "user", "content": f"Summarize this email :\n\n{email_content}"}
-                ]
+                ],
+                options={"num_predict": SUMMARY_MAX_TOKENS}
             )
             return response['message']['content']
         except Exception as e:
             #logger.error(f"Error summarizing email: {str(e)}")
             raise RuntimeError(f"Error summarizing emails : {str(e)}")
 
-    def process_todays_emails(self):
+    def process_todays_emails(self, cursor: str = None, page_size: int = DEFAULT_PAGE_SIZE):
         """
-        Process today's emails and return their summaries.
+        Fetch and summarize today's emails, most urgent first, one page at a time.
 
-        This method:
-        1. Fetches today's emails
-        2. Summarizes each email
-        3. Returns a list of email summaries with metadata
+        Up to MAX_TRIAGE_MESSAGES of today's emails are ranked by a cheap urgency
+        triage before any model call, so an urgent email is found even when many
+        newer ones arrived after it. On each page, high and normal priority emails
+        are summarized in rank order until the configured model budget is spent;
+        low priority emails and those over budget get a metadata-only line
+        instead. Summaries are cached, so asking for the next page does not redo
+        earlier work.
+
+        Args:
+            cursor (str): The next_cursor value from a previous call to get the next page.
+                          Leave empty for the first page.
+            page_size (int): Number of emails to return
 
         Returns:
-            list: List of dictionaries containing email summaries and metadata
-                  Each dictionary contains: subject, from, received, and summary
+            dict: Dictionary with items (each with id, from, subject, received, priority and
+                  summary), returned, total and next_cursor (None when there are no more emails)
         """
-        emails = self.get_todays_emails()
-        if not emails:
-            return []
-        
+        try:
+            triaged = self.triage_messages(self._list_messages(self._todays_query(), MAX_TRIAGE_MESSAGES))
+        except Exception as e:
+            raise RuntimeError(f"Error fetching emails: {str(e)}")
 
-        # Summarize all emails
-        email_summaries = []
-        for email in emails:
-            #logger.info(f"Processing email: {email['subject']} from {email['from']}")
-            #logger.info(f"Email body : {email['body']}...")
-            body = email['body']
-            summary = self.summarize_email(
-                f"Subject: {email['subject']}\n\nContent: {email['body']}"
-            )
-            email_summaries.append({
-                'subject': email['subject'],
-                'from': email['from'],
-                'received': email['received'],
-                'summary': summary
-            })
+        offset = decode_cursor(cursor)
+        page = triaged[offset:offset + page_size]
+        budget = self.llm_budget
+        items = []
+        for email in page:
+            record = self.summary_store.get(email['id'])
+            if record is None and email['priority'] != 'low' and budget > 0:
+                record = self._summarize_message(email['id'])
+                budget -= 1
+            if record is None:
+                reason = "low priority" if email['priority'] == 'low' else "summary budget reached"
+                record = self._metadata_line(email, reason)
+            record['priority'] = email['priority']
+            items.append(project(record, EMAIL_FIELDS))
+
+        next_offset = offset + len(page)
+        next_cursor = encode_cursor(next_offset) if next_offset < len(triaged) else None
+        logger.info(f"Gmail transfer so far: {self.fetch_report()}")
+        return compact_page(items, next_cursor=next_cursor, total=len(triaged),
+                            name="process_todays_emails", offset=offset)
+
+    def triage_messages(self, messages):
+        """
+        Rank messages by urgency and importance using cheap features only.
+
+        Features come from each message's headers and Gmail snippet (cached per
+        message), one listing of the user's recently sent mail, sender counts in
+        the local mail archive, and the number of listed messages per thread. No
+        message body is downloaded and no model is called. Only archived mail from
+        before today counts towards a known sender, so summarizing today's mail,
+        which archives it, does not change the ranking between calls.
+
+        Args:
+            messages (list): Dictionaries with id and threadId, newest first
+
+        Returns:
+            list: Dictionaries with id, thread_id, subject, from, received, snippet, score,
+                  priority and features, most urgent first (newest first within a score)
+        """
+        thread_counts = {}
+        for message in messages:
+            thread_counts[message['threadId']] = thread_counts.get(message['threadId'], 0) + 1
+        sent_threads = self._recent_sent_threads()
+        my_address = self._get_my_address()
+        start_of_day = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        since = start_of_day - timedelta(days=SENDER_HISTORY_DAYS)
+        self._prefetch_triage_metadata([message['id'] for message in messages])
+
+        triaged = []
+        for message in messages:
+            email = self._get_triage_metadata(message['id'])
+            sender = parseaddr(email['from'])[1].lower()
+            to = [address.lower() for _, address in getaddresses([email['to']])]
+            features = {
+                'replied_thread': email['thread_id'] in sent_threads,
+                'to_me': bool(my_address) and my_address in to,
+                'known_sender': bool(sender) and self.archive.count(since, start_of_day, sender) > 0,
+                'deadline_in_subject': deadline_mentions(email['subject']),
+                'deadline_in_snippet': deadline_mentions(email['snippet']),
+                'thread_messages': thread_counts[message['threadId']],
+                'promotional': self.is_promotional_email({'subject': email['subject'],
+                                                          'body': email['snippet']}),
+                'bulk': bool(email['list_unsubscribe']) or email['precedence'] in BULK_PRECEDENCE,
+            }
+            score, priority = triage_score(features)
+            triaged.append(dict(email, score=score, priority=priority, features=features))
+
+        # sorted() is stable, so equally scored messages stay newest first
+        triaged = sorted(triaged, key=lambda email: -email['score'])
+        logger.info("Triage: " + ", ".join(
+            f"{priority}={sum(1 for email in triaged if email['priority'] == priority)}"
+            for priority in PRIORITIES
+        ))
+        return triaged
+
+    def _get_triage_metadata(self, message_id):
+        """
+        Fetch the headers and snippet used for triage, reusing cached ones.
 
-        return email_summaries
+        Args:
+            message_id (str): Gmail message id
+
+        Returns:
+            dict: Dictionary with id, thread_id, subject, from, to, received, snippet,
+                  list_unsubscribe and precedence
+        """
+        cached = self.triage_store.get(message_id)
+        if cached is not None:
+            return cached
+        return self._store_triage_metadata(message_id, self._execute(self._triage_request(message_id)))
+
+    def _prefetch_triage_metadata(self, message_ids):
+        """
+        Fetch the triage metadata of uncached messages with Gmail batch requests.
+
+        Messages whose batched request fails are left uncached and fetched one by
+        one by _get_triage_metadata.
+
+        Args:
+            message_ids (list): Gmail message ids
+        """
+        missing = [message_id for message_id in message_ids if message_id not in self.triage_store]
+
+        def store(request_id, response, exception):
+            if exception is None:
+                self._store_triage_metadata(request_id, response)
+
+        for start in range(0, len(missing), TRIAGE_BATCH_SIZE):
+            batch = self.service.new_batch_http_request(callback=store)
+            for message_id in missing[start:start + TRIAGE_BATCH_SIZE]:
+                batch.add(self._count_bytes(self._triage_request(message_id)), request_id=message_id)
+            try:
+                batch.execute()
+            except Exception as e:
+                logger.error(f"Error fetching triage metadata: {str(e)}")
+
+    def _triage_request(self, message_id):
+        """Build the metadata-only request for one message's triage headers and snippet."""
+        return self.service.users().messages().get(
+            userId='me',
+            id=message_id,
+            format='metadata',
+            metadataHeaders=TRIAGE_HEADERS,
+            fields=TRIAGE_FIELDS
+        )
+
+    def _store_triage_metadata(self, message_id, msg):
+        """Extract and cache the triage metadata of a fetched message."""
+        self.fetch_stats['messages'] += 1
+        headers = {h['name'].lower(): h['value'] for h in msg.get('payload', {}).get('headers', [])}
+        email = {
+            'id': message_id,
+            'thread_id': msg.get('threadId'),
+            'subject': headers.get('subject', ''),
+            'from': headers.get('from', ''),
+            'to': headers.get('to', ''),
+            'received': headers.get('date', ''),
+            'snippet': msg.get('snippet', ''),
+            'list_unsubscribe': headers.get('list-unsubscribe', ''),
+            'precedence': headers.get('precedence', '').strip().lower()
+        }
+        self.triage_store.put(message_id, email)
+        return dict(email)
+
+    def _recent_sent_threads(self):
+        """
+        Get the ids of threads the user recently wrote in, refreshed every few minutes.
+
+        Returns:
+            set: Gmail thread ids
+        """
+        if self._sent_threads is None or time.monotonic() - self._sent_threads[0] > SENT_HISTORY_TTL_SECONDS:
+            try:
+                sent = self._list_messages(SENT_HISTORY_QUERY, MAX_SENT_HISTORY)
+                self._sent_threads = (time.monotonic(), {message['threadId'] for message in sent})
+            except Exception as e:
+                logger.error(f"Error listing sent emails for triage: {str(e)}")
+                return self._sent_threads[1] if self._sent_threads else set()
+        return self._sent_threads[1]
+
+    def _get_my_address(self):
+        """
+        Get the mailbox owner's email address.
+
+        Returns:
+            str: Lowercased email address, or an empty string if it cannot be read
+        """
+        if self._my_address is None:
+            try:
+                profile = self._execute(self.service.users().getProfile(userId='me', fields='emailAddress'))
+                self._my_address = profile.get('emailAddress', '').lower()
+            except Exception as e:
+                logger.error(f"Error reading mailbox profile: {str(e)}")
+                return ''
+        return self._my_address
+
+    def _metadata_line(self, email, reason):
+        """
+        Describe an email from its metadata alone, without a model call.
+
+        Args:
+            email (dict): Triage metadata from _get_triage_metadata
+            reason (str): Why the email was not summarized
+
+        Returns:
+            dict: Dictionary with id, subject, from, received and summary
+        """
+        snippet = email['snippet'][:TRIAGE_SNIPPET_CHARS]
+        return {
+            'id': email['id'],
+            'subject': email['subject'],
+            'from': email['from'],
+            'received': email['received'],
+            'summary': f"Not summarized ({reason}). Preview: {snippet}"
+        }
+
+    def _summarize_message(self, message_id):
+        """
+        Fetch and summarize one message, reusing a cached summary when available.
+
+        Args:
+            message_id (str): Gmail message id
+
+        Returns:
+            dict: Dictionary with id, subject, from, received and summary
+        """
+        cached = self.summary_store.get(message_id)
+        if cached is not None:
+            return cached
+
+        try:
+            email = self._fetch_record(message_id)
+        except Exception as e:
+            raise RuntimeError(f"Error fetching emails: {str(e)}")
+        summary = self.summarize_email(
+            f"Subject: {email.subject}\n\nContent: {email.body}"
+        )
+        record = {
+            'id': message_id,
+            'subject': email.subject,
+            'from': email.sender,
+            'received': email.received,
+            'summary': summary
+        }
+        self.summary_store.put(message_id, record)
+        return dict(record)
+
+    def process_todays_threads(self, cursor: str = None, page_size: int = DEFAULT_PAGE_SIZE):
+        """
+        Summarize today's email conversations, one summary per thread.
+
+        Each thread keeps a running summary. When new replies arrive, only the new
+        messages (with quoted text removed) and the previous summary are sent to the
+        model, so the cost depends on the new content rather than the thread length.
+
+        Args:
+            cursor (str): The next_cursor value from a previous call to get the next page.
+                          Leave empty for the first page.
+            page_size (int): Number of threads to return
+
+        Returns:
+            dict: Dictionary with items (each with thread_id, subject, participants, messages
+                  and summary), returned, total and next_cursor
+        """
+        try:
+            messages = self._list_messages(self._todays_query())
+        except Exception as e:
+            raise RuntimeError(f"Error fetching emails: {str(e)}")
+
+        # Group message ids by thread, keeping the most recently active threads first
+        threads = {}
+        for message in messages:
+            threads.setdefault(message['threadId'], []).append(message['id'])
+        thread_ids = list(threads)
+
+        offset = decode_cursor(cursor)
+        page = thread_ids[offset:offset + page_size]
+        items = [project(self._update_thread_summary(thread_id, threads[thread_id]), THREAD_FIELDS)
+                 for thread_id in page]
+
+        next_offset = offset + len(page)
+        next_cursor = encode_cursor(next_offset) if next_offset < len(thread_ids) else None
+        return compact_page(items, next_cursor=next_cursor, total=len(thread_ids),
+                            name="process_todays_threads", offset=offset)
+
+    def _update_thread_summary(self, thread_id, message_ids):
+        """
+        Bring a thread's running summary up to date with its new messages.
+
+        Args:
+            thread_id (str): Gmail thread id
+            message_ids (list): Ids of the thread's messages seen in this listing
+
+        Returns:
+            dict: Thread record with thread_id, subject, participants, message_ids,
+                  messages and summary
+        """
+        record = self.thread_store.get(thread_id) or {
+            'thread_id': thread_id,
+            'subject': '',
+            'participants': [],
+            'message_ids': [],
+            'summary': ''
+        }
+        new_ids = [message_id for message_id in message_ids if message_id not in record['message_ids']]
+        if not new_ids:
+            return record
+
+        try:
+            new_emails = sorted((self._fetch_email(message_id) for message_id in new_ids),
+                                key=lambda email: email['internal_date'])
+        except Exception as e:
+            raise RuntimeError(f"Error fetching emails: {str(e)}")
+
+        parts = []
+        for index, email in enumerate(new_emails):
+            body = strip_quoted_text(email['body'])
+            if index == 0 and not record['summary']:
+                # Without a previous summary the first message's quoted history is the only context
+                body = email['body'][:THREAD_CONTEXT_MAX_CHARS]
+            parts.append(f"From: {email['from']}\nDate: {email['received']}\n\n{body}")
+            if email['from'] not in record['participants']:
+                record['participants'].append(email['from'])
+
+        record['subject'] = record['subject'] or new_emails[0]['subject']
+        record['summary'] = self.summarize_thread_update(
+            record['subject'], record['summary'], "\n\n---\n\n".join(parts)
+        )
+        record['message_ids'] = record['message_ids'] + new_ids
+        record['messages'] = len(record['message_ids'])
+        self.thread_store.put(thread_id, record)
+        return record
+
+    def summarize_thread_update(self, subject, previous_summary, new_messages):
+        """
+        Update a thread summary with newly arrived messages using Ollama.
+
+        Args:
+            subject (str): Thread subject
+            previous_summary (str): Current summary of the thread, empty for a new thread
+            new_messages (str): The new messages, oldest first
+
+        Returns:
+            str: Updated thread summary
+
+        Raises:
+            RuntimeError: If there's an error during summarization
+        """
+        try:
+            response = model_session.chat(
+                model=OLLAMA_MODEL,
+                messages=[
+                    {"role": "system", "content": THREAD_SUMMARY_SYSTEM_PROMPT},
+                    {"role": "user", "content": f"Subject: {subject}\n\n"
+                                                f"Previous summary:\n{previous_summary or '(new thread)'}\n\n"
+                                                f"New messages:\n{new_messages}"}
+                ]
+            )
+            return response['message']['content']
+        except Exception as e:
+            raise RuntimeError(f"Error summarizing thread : {str(e)}")
 
     def get_emails_by_date_range(self, start_date: datetime, end_date: datetime):
         """
@@ -275,94 +910,272 @@ class EmailHandler:
         Returns:
             list: List of dictionaries containing email data (subject, sender, date, body)
 
+        Raises:
+            RuntimeError: If there's an error fetching emails
+            ValueError: If start_date is after end_date
+        """
+        return [record.to_dict() for record in self.get_email_records_by_date_range(start_date, end_date)]
+
+    def get_email_records_by_date_range(self, start_date: datetime, end_date: datetime,
+                                        max_results=MAX_EMAILS_TO_FETCH):
+        """
+        Fetch emails within a specified date range as compact records.
+
+        Args:
+            start_date (datetime): Start date for email search
+            end_date (datetime): End date for email search
+            max_results (int): Maximum number of emails to fetch
+
+        Returns:
+            list: List of EmailRecord objects, newest first
+
         Raises:
             RuntimeError: If there's an error fetching emails
             ValueError: If start_date is after end_date
         """
         try:
-            # Validate date range
-            if start_date > end_date:
-                raise ValueError("Start date cannot be after end date")
+            return list(self.iter_email_records(self._date_range_query(start_date, end_date), max_results))
+        except Exception as e:
+            raise RuntimeError(f"Error fetching emails: {str(e)}")
 
-            # Format dates for Gmail API
-            start_str = start_date.strftime("%Y/%m/%d")
-            end_str = end_date.strftime("%Y/%m/%d")
-            
-            # Search for emails within date range
-            query = f'after:{start_str} before:{end_str} -category:promotions -category:social -category:updates'
-            results = self.service.users().messages().list(
-                userId='me',
-                q=query,
-                maxResults=MAX_EMAILS_TO_FETCH
-            ).execute()
+    def summarize_period(self, period: str = "week", date: str = None):
+        """
+        Get a digest of the emails received in a day, week or month.
 
-            messages = results.get('messages', [])
-            emails = []
+        Daily digests are stored and only rebuilt for days with new mail, and the
+        week or month digest is merged from the stored daily digests.
 
-            for message in messages:
-                msg = self.service.users().messages().get(
-                    userId='me',
-                    id=message['id'],
-                    format='full'
-                ).execute()
-
-                # Get email details
-                headers = msg['payload']['headers']
-                subject = next(h['value'] for h in headers if h['name'] == 'Subject')
-                sender = next(h['value'] for h in headers if h['name'] == 'From')
-                date = next(h['value'] for h in headers if h['name'] == 'Date')
-
-                # Get email body
-                if 'parts' in msg['payload']:
-                    body = self._get_email_body(msg['payload']['parts'])
-                else:
-                    body = base64.urlsafe_b64decode(
-                        msg['payload']['body']['data']
-                    ).decode('utf-8')
-
-                email_data = {
-                    'subject': subject,
-                    'from': sender,
-                    'received': date,
-                    'body': body
-                }
-                emails.append(email_data)
+        Args:
+            period (str): One of day, week or month
+            date (str): Any date inside the period as YYYY-MM-DD. Defaults to today.
 
-            return emails
+        Returns:
+            dict: Dictionary with period, start_date, end_date, message_count and digest
+        """
+        try:
+            day = datetime.strptime(date, "%Y-%m-%d") if date else datetime.now()
+            day = day.replace(hour=0, minute=0, second=0, microsecond=0)
+            if period == "day":
+                start, end, key = day, day, f"day-{day:%Y-%m-%d}"
+            elif period == "week":
+                start = day - timedelta(days=day.weekday())
+                end = start + timedelta(days=6)
+                year, week, _ = start.isocalendar()
+                key = f"week-{year}-W{week:02d}"
+            elif period == "month":
+                start = day.replace(day=1)
+                end = (start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+                key = f"month-{start:%Y-%m}"
+            else:
+                raise ValueError("period must be one of day, week or month")
+            return self._rollup_digest(key, start, min(end, datetime.now()))
+        except Exception as e:
+            logger.error(f"Error summarizing period: {str(e)}")
+            return {"status": "Error", "message": f"Error summarizing period: {str(e)}"}
+
+    def digest_emails_by_date_range(self, start_date: datetime, end_date: datetime):
+        """
+        Get one digest for the emails within a date range, reusing stored daily digests.
+
+        Args:
+            start_date (datetime): First day of the range
+            end_date (datetime): Last day of the range (inclusive)
 
+        Returns:
+            dict: Dictionary with period, start_date, end_date, message_count and digest
+
+        Raises:
+            ValueError: If start_date is after end_date
+        """
+        if start_date > end_date:
+            raise ValueError("Start date cannot be after end date")
+        start = start_date.replace(hour=0, minute=0, second=0, microsecond=0)
+        end = end_date.replace(hour=0, minute=0, second=0, microsecond=0)
+        return self._rollup_digest(f"range-{start:%Y-%m-%d}-{end:%Y-%m-%d}", start, end)
+
+    def get_daily_digest(self, day: datetime):
+        """
+        Get the stored digest of one day, rebuilding it only if the day's mail changed.
+
+        Args:
+            day (datetime): The day to digest
+
+        Returns:
+            dict: Dictionary with day, fingerprint, message_count and digest
+        """
+        day = day.replace(hour=0, minute=0, second=0, microsecond=0)
+        key = f"day-{day:%Y-%m-%d}"
+        query = (f'after:{day:%Y/%m/%d} before:{day + timedelta(days=1):%Y/%m/%d} '
+                 f'-category:promotions -category:social -category:updates')
+        message_ids = self._list_message_ids(query, MAX_DIGEST_MESSAGES_PER_DAY)
+        day_fingerprint = fingerprint(message_ids)
+
+        stored = self.digest_store.get(key)
+        if stored and stored['fingerprint'] == day_fingerprint:
+            return stored
+
+        if message_ids:
+            summaries = [self._summarize_message(message_id) for message_id in message_ids]
+            digest = self._merge_digests(
+                f"Emails received on {day:%A %Y-%m-%d}",
+                [f"From: {s['from']}\nSubject: {s['subject']}\n{s['summary']}" for s in summaries]
+            )
+        else:
+            digest = NO_MAIL_DIGEST
+        stored = {
+            'day': f"{day:%Y-%m-%d}",
+            'fingerprint': day_fingerprint,
+            'message_count': len(message_ids),
+            'digest': digest
+        }
+        self.digest_store.put(key, stored)
+        logger.info(f"Rebuilt daily digest for {stored['day']} ({len(message_ids)} emails)")
+        return stored
+
+    def _rollup_digest(self, key, start, end):
+        """
+        Merge the daily digests of start..end into one stored rollup digest.
+
+        Args:
+            key (str): Digest key of the rollup
+            start (datetime): First day
+            end (datetime): Last day (inclusive)
+
+        Returns:
+            dict: Dictionary with period, start_date, end_date, message_count and digest
+        """
+        days = []
+        day = start
+        while day <= end:
+            days.append(self.get_daily_digest(day))
+            day += timedelta(days=1)
+        if len(days) == 1:
+            only = days[0]
+            return {'period': key, 'start_date': only['day'], 'end_date': only['day'],
+                    'message_count': only['message_count'], 'digest': only['digest']}
+
+        rollup_fingerprint = fingerprint(f"{d['day']}:{d['fingerprint']}" for d in days)
+        stored = self.digest_store.get(key)
+        if stored and stored['fingerprint'] == rollup_fingerprint:
+            return {k: v for k, v in stored.items() if k != 'fingerprint'}
+
+        with_mail = [d for d in days if d['message_count']]
+        digest = self._merge_digests(
+            f"Daily digests from {start:%Y-%m-%d} to {end:%Y-%m-%d}",
+            [f"{d['day']}:\n{d['digest']}" for d in with_mail]
+        ) if with_mail else NO_MAIL_DIGEST
+        stored = {
+            'period': key,
+            'start_date': f"{start:%Y-%m-%d}",
+            'end_date': f"{end:%Y-%m-%d}",
+            'message_count': sum(d['message_count'] for d in days),
+            'fingerprint': rollup_fingerprint,
+            'digest': digest
+        }
+        self.digest_store.put(key, stored)
+        return {k: v for k, v in stored.items() if k != 'fingerprint'}
+
+    def _merge_digests(self, title, items):
+        """
+        Merge summaries or digests into one digest with Ollama.
+
+        Args:
+            title (str): What the items cover
+            items (list): Summary or digest texts
+
+        Returns:
+            str: Merged digest
+
+        Raises:
+            RuntimeError: If there's an error during summarization
+        """
+        if len(items) == 1:
+            return items[0]
+        try:
+            response = model_session.chat(
+                model=OLLAMA_MODEL,
+                messages=[
+                    {"role": "system", "content": DIGEST_SYSTEM_PROMPT},
+                    {"role": "user", "content": f"{title}\n\n" + "\n\n---\n\n".join(items)}
+                ]
+            )
+            return response['message']['content']
         except Exception as e:
-            raise RuntimeError(f"Error fetching emails: {str(e)}")
+            raise RuntimeError(f"Error merging digests : {str(e)}")
 
-    def process_emails_by_date_range(self, start_date: datetime, end_date: datetime):
+    def archive_emails_by_date_range(self, start_date: datetime, end_date: datetime,
+                                     max_results=MAX_ARCHIVE_FETCH):
         """
-        Process emails within a date range and return their summaries.
+        Download emails within a date range into the local mail archive.
+
+        Messages already in the archive are skipped, and records are appended in
+        batches so memory stays bounded however large the range is.
 
         Args:
             start_date (datetime): Start date for email search
             end_date (datetime): End date for email search
+            max_results (int): Maximum number of emails to fetch
 
         Returns:
-            list: List of dictionaries containing email summaries and metadata
-                  Each dictionary contains: subject, from, received, and summary
+            dict: Dictionary with status, archived and total (messages in the archive)
         """
-        emails = self.get_emails_by_date_range(start_date, end_date)
-        if not emails:
-            return []
+        try:
+            archived = 0
+            batch = []
+            query = self._date_range_query(start_date, end_date)
+            # Records are appended in batches below instead of one by one
+            for record in self.iter_email_records(query, max_results, archive=False):
+                batch.append(record)
+                if len(batch) >= ARCHIVE_BATCH_SIZE:
+                    archived += self.archive.append(batch)
+                    batch = []
+            archived += self.archive.append(batch)
+            return {'status': 'success', 'archived': archived, 'total': len(self.archive)}
+        except Exception as e:
+            raise RuntimeError(f"Error archiving emails: {str(e)}")
 
-        # Summarize all emails
-        email_summaries = []
-        for email in emails:
-            summary = self.summarize_email(
-                f"Subject: {email['subject']}\n\nContent: {email['body']}"
-            )
-            email_summaries.append({
-                'subject': email['subject'],
-                'from': email['from'],
-                'received': email['received'],
-                'summary': summary
-            })
+    def _date_range_query(self, start_date, end_date):
+        """
+        Build the Gmail search query for a date range.
 
-        return email_summaries
+        Args:
+            start_date (datetime): Start date for email search
+            end_date (datetime): End date for email search
+
+        Returns:
+            str: Gmail search query
+
+        Raises:
+            ValueError: If start_date is after end_date
+        """
+        # Validate date range
+        if start_date > end_date:
+            raise ValueError("Start date cannot be after end date")
+
+        # Format dates for Gmail API
+        start_str = start_date.strftime("%Y/%m/%d")
+        end_str = end_date.strftime("%Y/%m/%d")
+        return f'after:{start_str} before:{end_str} -category:promotions -category:social -category:updates'
+
+    def process_emails_by_date_range(self, start_date: datetime, end_date: datetime):
+        """
+        Summarize the emails within a date range as one digest.
+
+        The range is answered from the stored daily digests, so the model is only
+        called for days that are missing or received new mail since they were
+        digested (see digest_emails_by_date_range).
+
+        Args:
+            start_date (datetime): First day of the range
+            end_date (datetime): Last day of the range (inclusive)
+
+        Returns:
+            dict: Dictionary with period, start_date, end_date, message_count and digest
+
+        Raises:
+            ValueError: If start_date is after end_date
+        """
+        return self.digest_emails_by_date_range(start_date, end_date)
     
     def send_email(self, to_email, subject, body, is_html=False):
         """
@@ -379,45 +1192,9 @@ class EmailHandler:
         """
         try:
             # Improve email body using Ollama
-            improved_body = ollama.chat(
-                model=OLLAMA_MODEL,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": """You are an email writing assistant. Your task is to improve the given email content while maintaining its core message.
-                        Guidelines:
-                        1. Keep it professional and courteous
-                        2. Maintain clear and concise language
-                        3. Use proper grammar and punctuation
-                        4. Structure the content logically
-                        5. Keep the original intent and tone
-                        6. Add appropriate greetings and closings if missing
-                        7. Format paragraphs properly
-                        8. Remove any inappropriate or unprofessional content"""
-                    },
-                    {
-                        "role": "user",
-                        "content": f"""Please improve this email while keeping its main message:
-                        Subject: {subject}
-                        Content: {body}"""
-                    }
-                ]
-            )['message']['content']
-
-            message = MIMEMultipart("alternative")
-            message['to'] = to_email
-            message['subject'] = subject
+            improved_body = self._improve_body(subject, body)
             logger.info(f"Improved Body : {improved_body}")
-            if is_html:
-                part = MIMEText(improved_body, 'html')
-            else:
-                part = MIMEText(improved_body, 'plain')
-            message.attach(part)
-            raw_message = base64.urlsafe_b64encode(message.as_bytes()).decode('utf-8')
-            sent_message = self.service.users().messages().send(
-                userId="me",
-                body={'raw': raw_message}
-            ).execute()
+            sent_message = self._deliver(to_email, subject, improved_body, is_html)
             return str({
                 'status': 'success',
                 'message_id': sent_message['id'],
@@ -430,8 +1207,212 @@ class EmailHandler:
                 "status": "Error",
                 "message": f"Error sending email: {str(e)}"
             }
-        
-    
+
+    def send_bulk_email(self, subject, body, recipients, is_html=False, personalize=False,
+                        dry_run=False, rewrite_workers=BULK_REWRITE_WORKERS,
+                        send_workers=BULK_SEND_WORKERS, sends_per_second=BULK_SENDS_PER_SECOND):
+        """
+        Send a personalized copy of a template email to many recipients.
+
+        Placeholders such as {name} in the subject and body are filled from each
+        recipient's variables; a recipient left with an unfilled placeholder is
+        not sent to and gets an error result. Unless personalize is set, the template is rewritten
+        by the model once and the placeholders are filled in afterwards; if the
+        rewrite loses a placeholder, each recipient's copy is rewritten instead.
+        Rewrites run concurrently and delivery uses rate-limited concurrent sends.
+
+        Args:
+            subject (str): Subject template
+            body (str): Body template
+            recipients (list): Dictionaries with 'email' and optional 'variables'
+            is_html (bool): Whether the body content is HTML
+            personalize (bool): Rewrite every recipient's filled-in copy separately
+            dry_run (bool): Rewrite and render every message but do not send
+            rewrite_workers (int): Concurrent model rewrites
+            send_workers (int): Concurrent Gmail send requests
+            sends_per_second (float): Upper bound on the Gmail send rate
+
+        Returns:
+            dict: Dictionary with status, sent, failed, results (one entry per recipient
+                  with to, status and message_id or message; dry runs include the
+                  rendered subject and body instead) and timings
+        """
+        timings = {'llm_calls': 0}
+        start = time.perf_counter()
+        # Only the body is rewritten, so only its placeholders must survive the rewrite
+        placeholders = set(PLACEHOLDER_PATTERN.findall(body))
+
+        template_body = None
+        if not personalize:
+            try:
+                template_body = self._improve_body(subject, body)
+                timings['llm_calls'] += 1
+            except Exception as e:
+                logger.error(f"Error improving email template: {str(e)}")
+                template_body = body
+            if not placeholders.issubset(PLACEHOLDER_PATTERN.findall(template_body)):
+                logger.info("Rewrite dropped template placeholders; rewriting per recipient")
+                template_body = None
+
+        messages = []
+        for recipient in recipients:
+            variables = recipient.get('variables', {})
+            message = {
+                'to': recipient['email'],
+                'subject': _fill_placeholders(subject, variables),
+                'body': _fill_placeholders(template_body or body, variables)
+            }
+            missing = sorted(set(PLACEHOLDER_PATTERN.findall(message['subject'] + message['body'])))
+            if missing:
+                message['error'] = f"No value for placeholder(s): {', '.join(missing)}"
+            messages.append(message)
+
+        if template_body is None:
+            def rewrite(message):
+                message['body'] = self._improve_body(message['subject'], message['body'])
+                return message
+
+            with ThreadPoolExecutor(max_workers=rewrite_workers) as executor:
+                futures = {executor.submit(rewrite, message): message
+                           for message in messages if 'error' not in message}
+                for future in as_completed(futures):
+                    timings['llm_calls'] += 1
+                    if future.exception():
+                        futures[future]['error'] = f"Error improving email: {str(future.exception())}"
+        timings['rewrite_s'] = round(time.perf_counter() - start, 3)
+
+        send_start = time.perf_counter()
+        limiter = _RateLimiter(sends_per_second)
+        local = threading.local()
+
+        def deliver(message):
+            if 'error' in message:
+                return {'to': message['to'], 'status': 'error', 'message': message['error']}
+            if dry_run:
+                return {'to': message['to'], 'status': 'dry_run',
+                        'subject': message['subject'], 'body': message['body']}
+            try:
+                if not hasattr(local, 'http'):
+                    # httplib2 connections must not be shared between threads
+                    local.http = AuthorizedHttp(self.creds, http=httplib2.Http())
+                limiter.wait()
+                sent = self._deliver(message['to'], message['subject'], message['body'],
+                                     is_html, http=local.http)
+                return {'to': message['to'], 'status': 'success', 'message_id': sent['id']}
+            except Exception as e:
+                return {'to': message['to'], 'status': 'error', 'message': f"Error sending email: {str(e)}"}
+
+        with ThreadPoolExecutor(max_workers=send_workers) as executor:
+            results = list(executor.map(deliver, messages))
+        timings['send_s'] = round(time.perf_counter() - send_start, 3)
+        timings['total_s'] = round(time.perf_counter() - start, 3)
+
+        failed = sum(1 for result in results if result['status'] == 'error')
+        sent = sum(1 for result in results if result['status'] == 'success')
+        if dry_run:
+            status = 'dry_run'
+        elif failed == 0:
+            status = 'success'
+        else:
+            status = 'partial' if sent else 'error'
+        logger.info(f"Bulk send {status}: {sent} sent, {failed} failed, timings {timings}")
+        return {
+            'status': status,
+            'sent': sent,
+            'failed': failed,
+            'results': results,
+            'timings': timings
+        }
+
+    def _improve_body(self, subject, body):
+        """
+        Rewrite an email body with the model.
+
+        Args:
+            subject (str): Email subject
+            body (str): Email body content
+
+        Returns:
+            str: Improved email body
+        """
+        return model_session.chat(
+            model=OLLAMA_MODEL,
+            messages=[
+                {
+                    "role": "system",
+                    "content": EMAIL_REWRITE_SYSTEM_PROMPT
+                },
+                {
+                    "role": "user",
+                    "content": f"""Please improve this email while keeping its main message and any {{placeholders}} unchanged:
+                    Subject: {subject}
+                    Content: {body}"""
+                }
+            ]
+        )['message']['content']
+
+    def _deliver(self, to_email, subject, body, is_html=False, http=None):
+        """
+        Build a MIME message and send it through the Gmail API.
+
+        Only rate-limited (429) sends are retried. A send that failed with a server
+        error or a dropped connection may already have gone out, so retrying it
+        could deliver the email twice.
+
+        Args:
+            to_email (str): Recipient's email address
+            subject (str): Email subject
+            body (str): Email body content
+            is_html (bool): Whether the body content is HTML
+            http: Optional authorized HTTP object to send the request with
+
+        Returns:
+            dict: The sent message resource
+        """
+        message = MIMEMultipart("alternative")
+        message['to'] = to_email
+        message['subject'] = subject
+        if is_html:
+            part = MIMEText(body, 'html')
+        else:
+            part = MIMEText(body, 'plain')
+        message.attach(part)
+        raw_message = base64.urlsafe_b64encode(message.as_bytes()).decode('utf-8')
+        request = self.service.users().messages().send(
+            userId="me",
+            body={'raw': raw_message}
+        )
+        for attempt in range(SEND_RETRIES + 1):
+            try:
+                return request.execute(http=http)
+            except HttpError as e:
+                if e.resp.status != 429 or attempt == SEND_RETRIES:
+                    raise
+                time.sleep(SEND_RETRY_BACKOFF_SECONDS * 2 ** attempt)
+
+
+def _fill_placeholders(text, variables):
+    """Replace {name} placeholders that have a value in variables."""
+    return PLACEHOLDER_PATTERN.sub(
+        lambda match: str(variables.get(match.group(1), match.group(0))), text
+    )
+
+
+class _RateLimiter:
+    """Spread calls evenly so at most `rate` calls start per second across threads."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next, now)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
 
 
 if __name__ == "__main__":
@@ -439,7 +1420,7 @@ if __name__ == "__main__":
     today_summaries = email_handler.process_todays_emails()
 
     # Print today's email summaries
-    for email in today_summaries:
+    for email in today_summaries['items']:
         print(f"From: {email['from']}")
         print(f"Subject: {email['subject']}")
         print(f"Time: {email['received']}")
@@ -0,0 +1,81 @@
+class EmailRecord:
+    """
+    Compact record of a fetched email.
+
+    Uses __slots__ instead of a per-instance dict, and keeps the text/plain body
+    as the raw UTF-8 bytes of the Gmail payload. The body is only decoded to a
+    string when it is accessed, so large batches of messages that are filtered
+    or counted never pay for decoded body strings (which take two or four bytes
+    per character as soon as a message contains non-Latin-1 text).
+
+    Attributes:
+        id (str): Gmail message id
+        thread_id (str): Gmail thread id
+        internal_date (int): Gmail internal date in milliseconds since the epoch
+        subject (str): Subject header
+        sender (str): From header
+        received (str): Date header
+    """
+
+    __slots__ = ('id', 'thread_id', 'internal_date', 'subject', 'sender', 'received', '_body')
+
+    def __init__(self, id, thread_id, internal_date, subject, sender, received, body=b''):
+        """
+        Initialize an email record.
+
+        Args:
+            id (str): Gmail message id
+            thread_id (str): Gmail thread id
+            internal_date (int): Gmail internal date in milliseconds since the epoch
+            subject (str): Subject header
+            sender (str): From header
+            received (str): Date header
+            body (bytes): Plain-text body as raw UTF-8 bytes
+        """
+        self.id = id
+        self.thread_id = thread_id
+        self.internal_date = internal_date
+        self.subject = subject
+        self.sender = sender
+        self.received = received
+        self._body = body
+
+    @property
+    def body(self):
+        """
+        Decode the plain-text body.
+
+        Returns:
+            str: Decoded body text
+        """
+        return self._body.decode('utf-8', errors='replace')
+
+    @property
+    def body_bytes(self):
+        """
+        Get the plain-text body without decoding it.
+
+        Returns:
+            bytes: Raw UTF-8 body bytes
+        """
+        return self._body
+
+    def to_dict(self):
+        """
+        Convert to the dictionary shape used by the agent tools.
+
+        Returns:
+            dict: Dictionary with id, thread_id, internal_date, subject, from, received and body
+        """
+        return {
+            'id': self.id,
+            'thread_id': self.thread_id,
+            'internal_date': self.internal_date,
+            'subject': self.subject,
+            'from': self.sender,
+            'received': self.received,
+            'body': self.body
+        }
+
+    def __repr__(self):
+        return f"EmailRecord(id={self.id!r}, sender={self.sender!r}, subject={self.subject!r})"
@@ -0,0 +1,275 @@
+import time
+import heapq
+import bisect
+import threading
+from datetime import datetime, timezone, time as dt_time
+from zoneinfo import ZoneInfo
+from dateutil.rrule import rruleset, rrulestr
+from googleapiclient.errors import HttpError
+from icalendar.prop import vRecur, vDDDTypes
+from .logger import logger
+from .tool_results import compact_event
+
+# Seconds before the cached event set is brought up to date with an incremental sync
+EVENT_CACHE_TTL_SECONDS = 300
+# Fields requested when syncing; recurring masters are kept unexpanded
+EVENT_SYNC_FIELDS = ("nextPageToken,nextSyncToken,items(id,status,summary,start,end,location,"
+                     "attendees(email),recurrence,recurringEventId,originalStartTime)")
+
+
+def parse_event_time(value, default_tz=timezone.utc):
+    """
+    Parse the start, end or originalStartTime of a Calendar event.
+
+    Args:
+        value (dict): Dictionary with dateTime or date, and optionally timeZone
+        default_tz (tzinfo): Time zone for all-day events without a timeZone
+
+    Returns:
+        tuple: (aware datetime, bool telling whether the event is all-day)
+    """
+    tz = ZoneInfo(value['timeZone']) if value.get('timeZone') else None
+    if value.get('dateTime'):
+        parsed = datetime.fromisoformat(value['dateTime'].replace('Z', '+00:00'))
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=tz or default_tz)
+        # Expand in the event's own zone so daylight saving shifts are followed
+        return (parsed.astimezone(tz) if tz else parsed), False
+    day = datetime.strptime(value['date'], "%Y-%m-%d")
+    return day.replace(tzinfo=tz or default_tz), True
+
+
+class EventCache:
+    """
+    Locally cached calendar events with client-side recurrence expansion.
+
+    The cache holds the unexpanded event set of the primary calendar and keeps it
+    current with incremental sync tokens. Recurring events are expanded locally
+    from their RRULE, RDATE and EXDATE lines, with modified and cancelled
+    instances applied on top. Any time window can then be answered lazily,
+    without downloading expanded instances from the server.
+
+    Attributes:
+        ttl (float): Seconds between incremental syncs
+    """
+
+    def __init__(self, service, calendar_id='primary', ttl=EVENT_CACHE_TTL_SECONDS):
+        """
+        Initialize an empty cache. Events are synced on first use.
+
+        Args:
+            service: Google Calendar API service instance
+            calendar_id (str): Calendar to cache
+            ttl (float): Seconds between incremental syncs
+        """
+        self.service = service
+        self.calendar_id = calendar_id
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._sync_token = None
+        self._synced_at = None
+        self._events = {}
+        self._exceptions = {}
+        self._singles = []
+        self._single_starts = []
+        self._longest_single = 0
+        self._masters = []
+
+    def invalidate(self):
+        """Force an incremental sync before the next query."""
+        self._synced_at = None
+
+    def refresh(self, force=False):
+        """
+        Bring the cached event set up to date.
+
+        Args:
+            force (bool): Sync even if the cache is younger than the TTL
+        """
+        with self._lock:
+            if not force and self._synced_at and time.monotonic() - self._synced_at < self.ttl:
+                return
+            try:
+                self._sync()
+            except HttpError as e:
+                if e.resp.status != 410:
+                    raise
+                # Sync token expired; start over with a full sync
+                logger.info("Calendar sync token expired, running a full sync")
+                self._sync_token = None
+                self._events = {}
+                self._sync()
+            self._index()
+            self._synced_at = time.monotonic()
+
+    def iter_events(self, start, end, collapse_recurring=False):
+        """
+        Lazily generate the event instances that overlap a window, in start order.
+
+        Args:
+            start (datetime): Aware start of the window
+            end (datetime): Aware end of the window
+            collapse_recurring (bool): Yield only the first instance of each recurring series
+
+        Yields:
+            dict: Compact event with id, summary, start, end and optionally location,
+                  attendees and recurrence
+        """
+        self.refresh()
+        streams = [self._iter_singles(start, end)]
+        for master in self._masters:
+            instances = self._iter_master(master, start, end)
+            if collapse_recurring:
+                instances = self._first(instances)
+            streams.append(instances)
+        for _, _, event in heapq.merge(*streams):
+            yield event
+
+    def _sync(self):
+        """Download changed events since the last sync token (or all events)."""
+        page_token = None
+        while True:
+            params = {
+                'calendarId': self.calendar_id,
+                'singleEvents': False,
+                'showDeleted': True,
+                'maxResults': 2500,
+                'pageToken': page_token,
+                'fields': EVENT_SYNC_FIELDS
+            }
+            if self._sync_token:
+                params['syncToken'] = self._sync_token
+            response = self.service.events().list(**params).execute()
+            for event in response.get('items', []):
+                if event.get('status') == 'cancelled' and not event.get('recurringEventId'):
+                    self._events.pop(event['id'], None)
+                else:
+                    self._events[event['id']] = event
+            page_token = response.get('nextPageToken')
+            if not page_token:
+                self._sync_token = response.get('nextSyncToken')
+                return
+
+    def _index(self):
+        """Split the cached events into single events, recurring masters and exceptions."""
+        singles = []
+        longest = 0
+        masters = []
+        exceptions = {}
+        for event in self._events.values():
+            if event.get('recurringEventId'):
+                # Modified or cancelled instance, keyed by the start it replaces
+                original, _ = parse_event_time(event['originalStartTime'])
+                series = exceptions.setdefault(event['recurringEventId'], {})
+                series[int(original.timestamp())] = event
+            elif event.get('recurrence'):
+                masters.append(event)
+            elif event.get('start'):
+                event_start, _ = parse_event_time(event['start'])
+                event_end, _ = parse_event_time(event['end'])
+                longest = max(longest, event_end.timestamp() - event_start.timestamp())
+                singles.append((event_start.timestamp(), event['id'], event))
+        singles.sort(key=lambda item: (item[0], item[1]))
+        self._singles = singles
+        self._single_starts = [item[0] for item in singles]
+        self._longest_single = longest
+        self._masters = masters
+        self._exceptions = exceptions
+
+    def _iter_singles(self, start, end):
+        """Yield non-recurring events overlapping the window."""
+        # No event starting before this bound can still be running at the window start
+        lower = bisect.bisect_left(self._single_starts, start.timestamp() - self._longest_single)
+        upper = bisect.bisect_left(self._single_starts, end.timestamp())
+        for timestamp, event_id, event in self._singles[lower:upper]:
+            if self._overlaps(event, start):
+                yield timestamp, event_id, self._compact(event)
+
+    def _iter_master(self, master, start, end):
+        """Yield the instances of one recurring event overlapping the window."""
+        try:
+            first_start, all_day = parse_event_time(master['start'])
+            first_end, _ = parse_event_time(master['end'], first_start.tzinfo)
+            duration = first_end - first_start
+            rules = self._rule_set(master, first_start, all_day)
+        except Exception as e:
+            logger.error(f"Skipping recurring event {master.get('id')}: {str(e)}")
+            return
+
+        exceptions = self._exceptions.get(master['id'], {})
+        moved = []
+        for exception in exceptions.values():
+            if exception.get('status') != 'cancelled' and self._overlaps(exception, start):
+                exception_start, _ = parse_event_time(exception['start'])
+                if exception_start < end:
+                    moved.append((exception_start.timestamp(), exception['id'], self._compact(exception)))
+        moved.sort(key=lambda item: (item[0], item[1]))
+
+        def generated():
+            for occurrence in rules.xafter(start - duration, inc=True):
+                if occurrence >= end:
+                    return
+                if occurrence + duration <= start:
+                    continue
+                if int(occurrence.timestamp()) in exceptions:
+                    continue
+                instance_id = f"{master['id']}_{occurrence.astimezone(timezone.utc):%Y%m%dT%H%M%SZ}"
+                yield occurrence.timestamp(), instance_id, self._compact(
+                    master, instance_id, occurrence, occurrence + duration, all_day
+                )
+
+        yield from heapq.merge(generated(), moved)
+
+    @staticmethod
+    def _rule_set(master, dtstart, all_day):
+        """Build a dateutil rule set from an event's recurrence lines."""
+        rules = rruleset()
+
+        def localize(value, tz):
+            if not isinstance(value, datetime):
+                value = datetime.combine(value, dtstart.time())
+            return value.replace(tzinfo=tz) if value.tzinfo is None else value
+
+        for line in master['recurrence']:
+            name, _, value = line.partition(':')
+            kind, *params = name.split(';')
+            params = dict(param.split('=', 1) for param in params if '=' in param)
+            tz = ZoneInfo(params['TZID']) if 'TZID' in params else dtstart.tzinfo
+            kind = kind.upper()
+            if kind == 'RRULE':
+                recur = vRecur.from_ical(value)
+                if recur.get('UNTIL'):
+                    until = recur['UNTIL'][0]
+                    if not isinstance(until, datetime):
+                        # A date UNTIL includes the whole day
+                        until = datetime.combine(until, dt_time.max)
+                    recur['UNTIL'] = [localize(until, tz).astimezone(timezone.utc)]
+                rules.rrule(rrulestr(vRecur(recur).to_ical().decode(), dtstart=dtstart))
+            elif kind in ('EXDATE', 'RDATE'):
+                for item in value.split(','):
+                    moment = localize(vDDDTypes.from_ical(item), tz)
+                    (rules.exdate if kind == 'EXDATE' else rules.rdate)(moment)
+        return rules
+
+    @staticmethod
+    def _first(instances):
+        """Yield only the first item of an iterator."""
+        for instance in instances:
+            yield instance
+            return
+
+    @staticmethod
+    def _overlaps(event, start):
+        """Whether an event ends after the window start."""
+        event_end, _ = parse_event_time(event['end'])
+        return event_end > start
+
+    @staticmethod
+    def _compact(event, instance_id=None, start=None, end=None, all_day=False):
+        """Project an event, or one generated instance of a recurring event, for the agent."""
+        compact = compact_event(event)
+        if instance_id:
+            compact['id'] = instance_id
+            compact['start'] = f"{start:%Y-%m-%d}" if all_day else start.isoformat()
+            compact['end'] = f"{end:%Y-%m-%d}" if all_day else end.isoformat()
+        return compact
@@ -0,0 +1,307 @@
+import time
+import threading
+from contextlib import contextmanager
+import httpx
+import ollama
+from .my_config import OLLAMA_HOSTS
+from .logger import logger
+
+# Seconds a health probe may take before the endpoint is considered down
+HEALTH_CHECK_TIMEOUT = 2
+# First and longest pause before a failed endpoint is probed again
+RETRY_BACKOFF_SECONDS = 5
+MAX_RETRY_BACKOFF_SECONDS = 300
+
+
+def is_failover_error(error):
+    """
+    Decide whether an error means the endpoint, rather than the request, failed.
+
+    Args:
+        error (Exception): Error raised by a model call
+
+    Returns:
+        bool: True for connection failures, timeouts and server-side errors
+    """
+    if isinstance(error, ollama.ResponseError):
+        return error.status_code >= 500
+    return isinstance(error, (httpx.TransportError, ConnectionError, TimeoutError))
+
+
+class OllamaEndpoint:
+    """
+    One Ollama server in the pool, with its load and health state.
+
+    Attributes:
+        host (str): Base URL of the server
+        client (ollama.Client): Client used for model calls
+        outstanding (int): Requests currently in flight
+        requests (int): Requests sent so far
+        failures (int): Consecutive failures; 0 while the endpoint is healthy
+        down_until (float): Monotonic time before which the endpoint is skipped
+        generation (int): Number of times the endpoint was marked down
+    """
+
+    def __init__(self, host):
+        """
+        Initialize an endpoint.
+
+        Args:
+            host (str): Base URL of the server, e.g. http://localhost:11434
+        """
+        self.host = host
+        self.client = ollama.Client(host=host)
+        self.outstanding = 0
+        self.requests = 0
+        self.failures = 0
+        self.down_until = 0.0
+        self.generation = 0
+
+    def probe(self):
+        """
+        Check that the server answers, without loading a model.
+
+        Returns:
+            bool: True if the server listed its models in time
+        """
+        try:
+            ollama.Client(host=self.host, timeout=HEALTH_CHECK_TIMEOUT).list()
+            return True
+        except Exception as e:
+            logger.warning(f"Health check of {self.host} failed: {str(e)}")
+            return False
+
+
+class OllamaPool:
+    """
+    Pool of Ollama servers shared by every model call site.
+
+    Each request goes to the healthy endpoint with the fewest requests in
+    flight. An endpoint that fails with a connection or server error is taken
+    out of rotation with exponential backoff and the request is retried on the
+    next endpoint. Once its backoff has passed, the endpoint is health-checked
+    before it receives traffic again.
+
+    A pool with a single host behaves like a plain ollama client, so the
+    default configuration keeps talking to http://localhost:11434.
+
+    Attributes:
+        endpoints (list): OllamaEndpoint per configured host
+    """
+
+    def __init__(self, hosts=None):
+        """
+        Initialize the pool.
+
+        Args:
+            hosts (list): Base URLs of the Ollama servers (defaults to OLLAMA_HOSTS)
+        """
+        self.endpoints = [OllamaEndpoint(host) for host in (hosts or OLLAMA_HOSTS)]
+        self._lock = threading.Lock()
+
+    def chat(self, model, messages, **kwargs):
+        """
+        Send a chat request to the least loaded healthy endpoint.
+
+        Args:
+            model (str): Model name
+            messages (list): Chat messages
+            **kwargs: Extra arguments forwarded to ollama.Client.chat
+
+        Returns:
+            dict: The Ollama chat response
+        """
+        return self.call(lambda endpoint: endpoint.client.chat(model=model, messages=messages, **kwargs))
+
+    def generate(self, model, prompt, **kwargs):
+        """
+        Send a generate request to the least loaded healthy endpoint.
+
+        Args:
+            model (str): Model name
+            prompt (str): Prompt text
+            **kwargs: Extra arguments forwarded to ollama.Client.generate
+
+        Returns:
+            dict: The Ollama generate response
+        """
+        return self.call(lambda endpoint: endpoint.client.generate(model=model, prompt=prompt, **kwargs))
+
+    def call(self, operation):
+        """
+        Run an operation against the pool, failing over to other endpoints.
+
+        Args:
+            operation (callable): Function taking an OllamaEndpoint and returning a result
+
+        Returns:
+            The operation's result
+
+        Raises:
+            RuntimeError: If every endpoint failed
+        """
+        tried = set()
+        last_error = None
+        while len(tried) < len(self.endpoints):
+            try:
+                with self.acquire(exclude=tried) as endpoint:
+                    tried.add(endpoint.host)
+                    return operation(endpoint)
+            except Exception as e:
+                if not is_failover_error(e):
+                    raise
+                last_error = e
+        raise RuntimeError(f"Error calling Ollama: all endpoints failed: {str(last_error)}")
+
+    def broadcast(self, operation):
+        """
+        Run an operation once on every healthy endpoint, e.g. to load a model everywhere.
+
+        Args:
+            operation (callable): Function taking an OllamaEndpoint and returning a result
+
+        Returns:
+            list: Results of the endpoints that succeeded
+        """
+        results = []
+        for endpoint in self.endpoints:
+            if endpoint.down_until > time.monotonic():
+                continue
+            try:
+                with self.acquire(only=endpoint.host) as reserved:
+                    results.append(operation(reserved))
+            except Exception as e:
+                logger.error(f"Error on Ollama endpoint {endpoint.host}: {str(e)}")
+        return results
+
+    @contextmanager
+    def acquire(self, exclude=(), only=None):
+        """
+        Reserve the least loaded healthy endpoint for the duration of a request.
+
+        A failover error raised inside the block takes the endpoint out of
+        rotation; any error is re-raised to the caller. The outcome of a request
+        only changes the endpoint's health if the endpoint was not marked down
+        while the request was in flight, so late results from before an outage
+        neither reset its backoff nor stack extra failures onto it.
+
+        Args:
+            exclude (set): Hosts not to pick, e.g. ones that already failed this request
+            only (str): Reserve this host instead of picking one
+
+        Yields:
+            OllamaEndpoint: The reserved endpoint
+
+        Raises:
+            RuntimeError: If no endpoint is left to try
+        """
+        endpoint, generation = self._reserve(exclude, only)
+        try:
+            yield endpoint
+        except Exception as e:
+            if is_failover_error(e):
+                self._mark_down(endpoint, e, generation)
+            raise
+        else:
+            self._mark_up(endpoint, generation)
+        finally:
+            with self._lock:
+                endpoint.outstanding -= 1
+
+    def check_health(self):
+        """
+        Probe every endpoint and update its health state.
+
+        Returns:
+            dict: Mapping of host to True (healthy) or False (down)
+        """
+        health = {}
+        for endpoint in self.endpoints:
+            healthy = endpoint.probe()
+            if healthy:
+                self._mark_up(endpoint)
+            else:
+                self._mark_down(endpoint, "health check failed")
+            health[endpoint.host] = healthy
+        return health
+
+    def status(self):
+        """
+        Report the load and health of every endpoint.
+
+        Returns:
+            dict: Per-host dictionary with healthy, outstanding, requests and failures
+        """
+        now = time.monotonic()
+        with self._lock:
+            return {
+                endpoint.host: {
+                    'healthy': endpoint.down_until <= now,
+                    'outstanding': endpoint.outstanding,
+                    'requests': endpoint.requests,
+                    'failures': endpoint.failures
+                }
+                for endpoint in self.endpoints
+            }
+
+    def _reserve(self, exclude, only=None):
+        """Pick an endpoint, count the request against it and return it with its generation."""
+        while True:
+            now = time.monotonic()
+            with self._lock:
+                candidates = [e for e in self.endpoints
+                              if e.host not in exclude and (only is None or e.host == only)]
+                if not candidates:
+                    raise RuntimeError("Error calling Ollama: no endpoint left to try")
+                available = [e for e in candidates if e.down_until <= now]
+                if available:
+                    endpoint = min(available, key=lambda e: (e.outstanding, e.requests))
+                else:
+                    # Everything is down; try whichever comes back first
+                    endpoint = min(candidates, key=lambda e: e.down_until)
+                recovering = endpoint.failures > 0
+                generation = endpoint.generation
+                endpoint.outstanding += 1
+                endpoint.requests += 1
+
+            # An endpoint coming back from a failure is probed before real traffic
+            if not recovering or endpoint.probe():
+                return endpoint, generation
+            with self._lock:
+                endpoint.outstanding -= 1
+                endpoint.requests -= 1
+            self._mark_down(endpoint, "health check failed", generation)
+            exclude = set(exclude) | {endpoint.host}
+
+    def _mark_down(self, endpoint, reason, generation=None):
+        """
+        Take an endpoint out of rotation with exponential backoff.
+
+        With a generation, nothing happens if the endpoint was marked down since then.
+        """
+        with self._lock:
+            if generation is not None and generation != endpoint.generation:
+                return
+            endpoint.generation += 1
+            endpoint.failures += 1
+            backoff = min(RETRY_BACKOFF_SECONDS * 2 ** (endpoint.failures - 1), MAX_RETRY_BACKOFF_SECONDS)
+            endpoint.down_until = time.monotonic() + backoff
+        logger.warning(f"Ollama endpoint {endpoint.host} marked down for {backoff}s: {reason}")
+
+    def _mark_up(self, endpoint, generation=None):
+        """
+        Return an endpoint to rotation.
+
+        With a generation, nothing happens if the endpoint was marked down since then.
+        """
+        with self._lock:
+            if generation is not None and generation != endpoint.generation:
+                return
+            if endpoint.failures:
+                logger.info(f"Ollama endpoint {endpoint.host} is back up")
+            endpoint.failures = 0
+            endpoint.down_until = 0.0
+
+
+# Shared pool used by every model call site
+llm_backend = OllamaPool()
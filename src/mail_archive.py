@@ -0,0 +1,363 @@
+import os
+import json
+import fcntl
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from email.utils import parseaddr
+import numpy as np
+from .logger import logger
+
+MAIL_ARCHIVE_DIR = "mail_archive"
+# Default look-back window for analytics queries without a start date
+DEFAULT_ANALYTICS_DAYS = 90
+
+# Fixed-width columns: file name -> numpy dtype
+FIXED_COLUMNS = {
+    'internal_date': np.int64,
+    'sender_id': np.int32,
+    'domain_id': np.int32,
+    'body_size': np.int32,
+}
+# Variable-width columns stored as a byte blob plus int64 end offsets
+BLOB_COLUMNS = ('subject', 'body')
+
+ANALYTICS_QUERIES = ('top_senders', 'volume_by_domain', 'volume_by_day', 'count')
+
+
+class MailArchive:
+    """
+    Append-only columnar archive of fetched messages.
+
+    Each column lives in its own file: fixed-width columns as raw little-endian
+    arrays, and subjects and bodies as byte blobs with an offsets column. Senders
+    and sender domains are dictionary encoded. Queries memory-map the columns and
+    run vectorized numpy scans, so analytics over hundreds of thousands of
+    messages never re-download mail or load the bodies.
+
+    The committed row count is kept in meta.json and written after the columns,
+    so a partially written append is ignored by readers. Several instances may
+    share one directory: appends take a file lock, and the dictionaries and id
+    set are re-read whenever another instance has changed them.
+
+    Attributes:
+        path (str): Archive directory
+    """
+
+    def __init__(self, path=MAIL_ARCHIVE_DIR):
+        """
+        Initialize the archive. Nothing is read until the archive is used.
+
+        Args:
+            path (str): Archive directory
+        """
+        self.path = path
+        self._dictionaries = None
+        self._dictionary_sizes = None
+        self._ids = None
+        self._ids_rows = None
+
+    def __len__(self):
+        return self._read_meta()['rows']
+
+    def append(self, records):
+        """
+        Append messages that are not in the archive yet.
+
+        Args:
+            records (iterable): EmailRecord objects
+
+        Returns:
+            int: Number of messages appended
+        """
+        os.makedirs(self.path, exist_ok=True)
+        with self._append_lock():
+            return self._append(records)
+
+    def _append(self, records):
+        """Append records while holding the archive lock."""
+        rows = self._read_meta()['rows']
+        self._truncate_to(rows)
+        self._load_ids(rows)
+
+        fixed = {name: [] for name in FIXED_COLUMNS}
+        blobs = {name: [] for name in BLOB_COLUMNS}
+        new_ids = []
+        seen = set()
+        for record in records:
+            if record.id in self._ids or record.id in seen:
+                continue
+            seen.add(record.id)
+            sender = parseaddr(record.sender)[1].lower() or record.sender.lower()
+            domain = sender.rpartition('@')[2]
+            body = record.body_bytes
+            fixed['internal_date'].append(record.internal_date)
+            fixed['sender_id'].append(self._encode('senders', sender))
+            fixed['domain_id'].append(self._encode('domains', domain))
+            fixed['body_size'].append(len(body))
+            blobs['subject'].append(record.subject.encode('utf-8'))
+            blobs['body'].append(body)
+            new_ids.append(record.id)
+
+        if not new_ids:
+            return 0
+
+        for name, dtype in FIXED_COLUMNS.items():
+            with open(self._file(f"{name}.col"), 'ab') as f:
+                np.asarray(fixed[name], dtype=dtype).tofile(f)
+        for name in BLOB_COLUMNS:
+            offsets = self._column(f"{name}.off", np.int64, rows)
+            start = int(offsets[-1]) if rows else 0
+            with open(self._file(f"{name}.bin"), 'ab') as f:
+                for value in blobs[name]:
+                    f.write(value)
+            ends = start + np.cumsum([len(value) for value in blobs[name]], dtype=np.int64)
+            with open(self._file(f"{name}.off"), 'ab') as f:
+                ends.tofile(f)
+        with open(self._file('ids.txt'), 'a') as f:
+            f.write("".join(f"{message_id}\n" for message_id in new_ids))
+
+        self._ids.update(new_ids)
+        self._write_meta({'rows': rows + len(new_ids)})
+        self._ids_rows = rows + len(new_ids)
+        logger.info(f"Archived {len(new_ids)} message(s); archive now holds {rows + len(new_ids)}")
+        return len(new_ids)
+
+    def top_senders(self, start=None, end=None, top_n=10):
+        """
+        Count messages per sender.
+
+        Args:
+            start (datetime): Inclusive start of the window, or None for no bound
+            end (datetime): Exclusive end of the window, or None for no bound
+            top_n (int): Number of senders to return
+
+        Returns:
+            list: Dictionaries with sender and count, most frequent first
+        """
+        # Rows are read first: every committed row's sender is already in the dictionary file
+        rows = len(self)
+        sender_ids = self._fixed('sender_id', rows)[self._date_mask(start, end, rows)]
+        senders = self._load_dictionaries()['senders']['values']
+        counts = np.bincount(sender_ids, minlength=len(senders))
+        return [{'sender': senders[i], 'count': int(counts[i])} for i in self._top(counts, top_n)]
+
+    def volume_by_domain(self, start=None, end=None, top_n=10):
+        """
+        Count messages per sender domain.
+
+        Args:
+            start (datetime): Inclusive start of the window, or None for no bound
+            end (datetime): Exclusive end of the window, or None for no bound
+            top_n (int): Number of domains to return
+
+        Returns:
+            list: Dictionaries with domain and count, most frequent first
+        """
+        rows = len(self)
+        domain_ids = self._fixed('domain_id', rows)[self._date_mask(start, end, rows)]
+        domains = self._load_dictionaries()['domains']['values']
+        counts = np.bincount(domain_ids, minlength=len(domains))
+        return [{'domain': domains[i], 'count': int(counts[i])} for i in self._top(counts, top_n)]
+
+    def volume_by_day(self, start=None, end=None, sender=None):
+        """
+        Count messages per UTC day.
+
+        Args:
+            start (datetime): Inclusive start of the window, or None for no bound
+            end (datetime): Exclusive end of the window, or None for no bound
+            sender (str): Optional sender email address to filter on
+
+        Returns:
+            list: Dictionaries with day (YYYY-MM-DD) and count, oldest first
+        """
+        rows = len(self)
+        mask = self._date_mask(start, end, rows) & self._sender_mask(sender, rows)
+        days, counts = np.unique(self._fixed('internal_date', rows)[mask] // 86_400_000, return_counts=True)
+        return [{'day': (datetime(1970, 1, 1) + timedelta(days=int(day))).strftime("%Y-%m-%d"),
+                 'count': int(count)} for day, count in zip(days, counts)]
+
+    def count(self, start=None, end=None, sender=None):
+        """
+        Count messages in a window.
+
+        Args:
+            start (datetime): Inclusive start of the window, or None for no bound
+            end (datetime): Exclusive end of the window, or None for no bound
+            sender (str): Optional sender email address to filter on
+
+        Returns:
+            int: Number of matching messages
+        """
+        rows = len(self)
+        return int(np.count_nonzero(self._date_mask(start, end, rows) & self._sender_mask(sender, rows)))
+
+    def mailbox_analytics(self, query: str, start_date: str = None, end_date: str = None,
+                          sender: str = None, top_n: int = 10):
+        """
+        Answer mailbox statistics from the local mail archive without downloading mail.
+
+        The archive holds every message the assistant has fetched, plus any date
+        ranges backfilled with EmailHandler.archive_emails_by_date_range.
+
+        Args:
+            query (str): One of top_senders, volume_by_domain, volume_by_day or count
+            start_date (str): Start date as YYYY-MM-DD. Defaults to 90 days ago.
+            end_date (str): End date as YYYY-MM-DD (inclusive). Defaults to today.
+            sender (str): Optional sender email address for volume_by_day and count
+            top_n (int): Number of rows for top_senders and volume_by_domain
+
+        Returns:
+            dict: Dictionary with query, start_date, end_date, archived_messages and result
+        """
+        try:
+            if query not in ANALYTICS_QUERIES:
+                raise ValueError(f"query must be one of {', '.join(ANALYTICS_QUERIES)}")
+            end = datetime.strptime(end_date, "%Y-%m-%d") if end_date else datetime.now()
+            end = end.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+            start = (datetime.strptime(start_date, "%Y-%m-%d") if start_date
+                     else end - timedelta(days=DEFAULT_ANALYTICS_DAYS))
+
+            if query == 'top_senders':
+                result = self.top_senders(start, end, top_n)
+            elif query == 'volume_by_domain':
+                result = self.volume_by_domain(start, end, top_n)
+            elif query == 'volume_by_day':
+                result = self.volume_by_day(start, end, sender)
+            else:
+                result = self.count(start, end, sender)
+            return {
+                'query': query,
+                'start_date': start.strftime("%Y-%m-%d"),
+                'end_date': (end - timedelta(days=1)).strftime("%Y-%m-%d"),
+                'archived_messages': len(self),
+                'result': result
+            }
+        except Exception as e:
+            logger.error(f"Error running mailbox analytics: {str(e)}")
+            return {'status': 'error', 'message': f"Error running mailbox analytics: {str(e)}"}
+
+    def _date_mask(self, start, end, rows):
+        """Boolean mask of the first rows rows with start <= internal_date < end."""
+        dates = self._fixed('internal_date', rows)
+        mask = np.ones(len(dates), dtype=bool)
+        if start is not None:
+            mask &= dates >= int(start.timestamp() * 1000)
+        if end is not None:
+            mask &= dates < int(end.timestamp() * 1000)
+        return mask
+
+    def _sender_mask(self, sender, rows):
+        """Boolean mask of the first rows rows from the given sender, or all of them if sender is empty."""
+        sender_ids = self._fixed('sender_id', rows)
+        if not sender:
+            return np.ones(len(sender_ids), dtype=bool)
+        sender_id = self._load_dictionaries()['senders']['ids'].get(sender.lower())
+        if sender_id is None:
+            return np.zeros(len(sender_ids), dtype=bool)
+        return sender_ids == sender_id
+
+    @staticmethod
+    def _top(counts, top_n):
+        """Indices of the top_n non-zero counts, largest first."""
+        if not len(counts):
+            return []
+        top = np.argsort(counts, kind='stable')[::-1][:top_n]
+        return [int(i) for i in top if counts[i]]
+
+    def _fixed(self, name, rows):
+        """Memory-map a fixed-width column up to a committed row count read once per query."""
+        return self._column(f"{name}.col", FIXED_COLUMNS[name], rows)
+
+    def _column(self, filename, dtype, rows):
+        """Memory-map the first rows values of a column file."""
+        if not rows:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(self._file(filename), dtype=dtype, mode='r', shape=(rows,))
+
+    def _truncate_to(self, rows):
+        """Drop data past the committed row count left by an interrupted append."""
+        for name, dtype in FIXED_COLUMNS.items():
+            self._truncate_file(f"{name}.col", rows * np.dtype(dtype).itemsize)
+        for name in BLOB_COLUMNS:
+            self._truncate_file(f"{name}.off", rows * 8)
+            offsets = self._column(f"{name}.off", np.int64, rows)
+            self._truncate_file(f"{name}.bin", int(offsets[-1]) if rows else 0)
+        ids = self._read_lines('ids.txt')
+        if len(ids) > rows:
+            with open(self._file('ids.txt'), 'w') as f:
+                f.write("".join(f"{message_id}\n" for message_id in ids[:rows]))
+
+    def _truncate_file(self, filename, size):
+        path = self._file(filename)
+        if os.path.exists(path) and os.path.getsize(path) > size:
+            with open(path, 'r+b') as f:
+                f.truncate(size)
+
+    def _encode(self, kind, value):
+        """Return the dictionary id of value, appending it to the dictionary if new."""
+        dictionary = self._load_dictionaries()[kind]
+        if value not in dictionary['ids']:
+            dictionary['ids'][value] = len(dictionary['values'])
+            dictionary['values'].append(value)
+            with open(self._file(f"{kind}.txt"), 'a') as f:
+                f.write(f"{value}\n")
+            self._dictionary_sizes = tuple(self._file_size(f"{name}.txt") for name in ('senders', 'domains'))
+        return dictionary['ids'][value]
+
+    def _load_dictionaries(self):
+        """Load the sender and domain dictionaries, re-reading them if they changed on disk."""
+        sizes = tuple(self._file_size(f"{kind}.txt") for kind in ('senders', 'domains'))
+        if self._dictionaries is None or sizes != self._dictionary_sizes:
+            self._dictionaries = {}
+            for kind in ('senders', 'domains'):
+                values = self._read_lines(f"{kind}.txt")
+                self._dictionaries[kind] = {
+                    'ids': {value: i for i, value in enumerate(values)},
+                    'values': values
+                }
+            self._dictionary_sizes = sizes
+        return self._dictionaries
+
+    def _load_ids(self, rows):
+        """Load the archived message ids, re-reading them if the committed row count changed."""
+        if self._ids is None or self._ids_rows != rows:
+            self._ids = set(self._read_lines('ids.txt')[:rows])
+            self._ids_rows = rows
+
+    @contextmanager
+    def _append_lock(self):
+        """Hold an exclusive lock on the archive across processes and threads."""
+        with open(self._file('.lock'), 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _file_size(self, filename):
+        path = self._file(filename)
+        return os.path.getsize(path) if os.path.exists(path) else 0
+
+    def _read_lines(self, filename):
+        path = self._file(filename)
+        if not os.path.exists(path):
+            return []
+        with open(path) as f:
+            return f.read().splitlines()
+
+    def _read_meta(self):
+        path = self._file('meta.json')
+        if not os.path.exists(path):
+            return {'rows': 0}
+        with open(path) as f:
+            return json.load(f)
+
+    def _write_meta(self, meta):
+        tmp_path = self._file('meta.json.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self._file('meta.json'))
+
+    def _file(self, filename):
+        return os.path.join(self.path, filename)
@@ -0,0 +1,138 @@
+import time
+import threading
+from .llm_backend import llm_backend
+from .logger import logger
+
+# How long Ollama keeps a model resident after its last request
+OLLAMA_KEEP_ALIVE = "30m"
+# A call whose model load takes longer than this is counted as a cold call
+COLD_LOAD_THRESHOLD_MS = 250
+
+
+class ModelSession:
+    """
+    Manage the lifetime of the local Ollama models used by the assistant.
+
+    This class provides functionality to:
+    - Warm the configured models at startup so the first request skips model load
+    - Send every chat request with a keep-alive so models stay resident
+    - Prime the KV cache with the static system prompt of each model
+    - Record cold versus warm latency per model
+
+    Prompt prefix reuse only works when the system prompt is byte-identical
+    between calls and no load-affecting option (such as num_ctx) changes, so
+    callers should pass module-level prompt constants and leave options alone.
+
+    Requests go through an LLM backend, by default the shared pool of Ollama
+    endpoints. Any object with the chat, generate and broadcast methods of
+    OllamaPool can be plugged in instead.
+
+    Attributes:
+        keep_alive (str): Keep-alive duration sent with every request
+        backend (OllamaPool): Backend the requests are sent to
+    """
+
+    def __init__(self, keep_alive=OLLAMA_KEEP_ALIVE, backend=None):
+        """
+        Initialize the model session.
+
+        Args:
+            keep_alive (str): Keep-alive duration sent with every request
+            backend (OllamaPool): Backend to send requests to (defaults to the shared pool)
+        """
+        self.keep_alive = keep_alive
+        self.backend = backend or llm_backend
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def warm_up(self, models):
+        """
+        Load the given models and prime their system prompts on every endpoint.
+
+        Args:
+            models (dict): Mapping of model name to the system prompt to prime,
+                           or None to only load the model
+
+        Returns:
+            dict: Latency report after warm-up (see latency_report)
+        """
+        self.backend.check_health()
+        for model, system_prompt in models.items():
+            self.backend.broadcast(lambda endpoint: self._warm_endpoint(endpoint, model, system_prompt))
+
+        report = self.latency_report()
+        logger.info(f"Model warm-up finished: {report}")
+        return report
+
+    def chat(self, model, messages, **kwargs):
+        """
+        Send a chat request to Ollama with keep-alive and latency tracking.
+
+        Args:
+            model (str): Model name
+            messages (list): Chat messages
+            **kwargs: Extra arguments forwarded to the backend's chat
+
+        Returns:
+            dict: The Ollama chat response
+        """
+        kwargs.setdefault("keep_alive", self.keep_alive)
+        start = time.perf_counter()
+        response = self.backend.chat(model=model, messages=messages, **kwargs)
+        self._record(model, time.perf_counter() - start, response)
+        return response
+
+    def latency_report(self):
+        """
+        Summarize the recorded latencies.
+
+        Returns:
+            dict: Per-model dictionary with cold_calls, cold_avg_ms, warm_calls,
+                  warm_avg_ms and prompt_tokens_evaluated
+        """
+        report = {}
+        with self._lock:
+            for model, stats in self._stats.items():
+                report[model] = {
+                    'cold_calls': len(stats['cold']),
+                    'cold_avg_ms': self._average(stats['cold']),
+                    'warm_calls': len(stats['warm']),
+                    'warm_avg_ms': self._average(stats['warm']),
+                    'prompt_tokens_evaluated': stats['prompt_tokens']
+                }
+        return report
+
+    def _warm_endpoint(self, endpoint, model, system_prompt):
+        """Load one model on one endpoint and prime its system prompt."""
+        start = time.perf_counter()
+        response = endpoint.client.generate(model=model, prompt="", keep_alive=self.keep_alive)
+        self._record(model, time.perf_counter() - start, response)
+        if system_prompt:
+            start = time.perf_counter()
+            response = endpoint.client.chat(
+                model=model,
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": "Ready?"}
+                ],
+                options={"num_predict": 1},
+                keep_alive=self.keep_alive
+            )
+            self._record(model, time.perf_counter() - start, response)
+
+    def _record(self, model, elapsed, response):
+        """Record one call, classifying it as cold when Ollama had to load the model."""
+        load_ms = (response.get('load_duration') or 0) / 1e6
+        cold = load_ms > COLD_LOAD_THRESHOLD_MS
+        with self._lock:
+            stats = self._stats.setdefault(model, {'cold': [], 'warm': [], 'prompt_tokens': 0})
+            stats['cold' if cold else 'warm'].append(elapsed * 1000)
+            stats['prompt_tokens'] += response.get('prompt_eval_count') or 0
+
+    @staticmethod
+    def _average(values):
+        return round(sum(values) / len(values), 1) if values else None
+
+
+# Shared session used by every model call site
+model_session = ModelSession()
@@ -11,7 +11,9 @@ load_dotenv()
 
 # Ollama Configuration
 OLLAMA_MODEL = "gemma3:1b"
-OLLAMA_BASE_URL = "http://localhost:11434"
+# Comma-separated Ollama servers to balance model calls across
+OLLAMA_HOSTS = [host.strip() for host in os.getenv('OLLAMA_HOSTS', "http://localhost:11434").split(',')
+                if host.strip()]
 
 
 # Application Settings
@@ -0,0 +1,153 @@
+import time
+import threading
+from collections import deque
+from googleapiclient.errors import HttpError
+from .email_handler import EmailHandler
+from .logger import logger
+
+# Seconds between two polls for new mail
+PREFETCH_POLL_SECONDS = 120
+# Maximum number of messages summarized in one poll
+MAX_MESSAGES_PER_POLL = 20
+# New message ids waiting to be summarized; the oldest are dropped beyond this
+MAX_PENDING_MESSAGES = 200
+# Upper bound for the back-off after consecutive failed polls
+MAX_BACKOFF_SECONDS = 900
+# Messages carrying these labels are skipped, matching the interactive query
+SKIPPED_LABELS = {'CATEGORY_PROMOTIONS', 'CATEGORY_SOCIAL', 'CATEGORY_UPDATES'}
+
+
+class PrefetchWorker(threading.Thread):
+    """
+    Background thread that summarizes new mail ahead of the user's questions.
+
+    The worker seeds itself with today's messages, then polls the Gmail history
+    API for messages added since the last seen history id. New messages are
+    fetched and summarized off the request path and written to the shared
+    SummaryStore, so interactive requests can answer from precomputed summaries.
+
+    The worker builds its own EmailHandler, because Gmail API clients must not
+    be shared between threads.
+
+    Attributes:
+        summary_store (SummaryStore): Store shared with the interactive EmailHandler
+        poll_interval (float): Seconds between polls
+        max_messages_per_poll (int): Cap on messages summarized per poll
+        stats (dict): Counters for polls, summarized messages and errors
+    """
+
+    def __init__(self, summary_store, poll_interval=PREFETCH_POLL_SECONDS,
+                 max_messages_per_poll=MAX_MESSAGES_PER_POLL, handler_factory=EmailHandler):
+        """
+        Initialize the worker. Call start() to begin polling.
+
+        Args:
+            summary_store (SummaryStore): Store shared with the interactive EmailHandler
+            poll_interval (float): Seconds between polls
+            max_messages_per_poll (int): Cap on messages summarized per poll
+            handler_factory (callable): Builds the worker's own EmailHandler
+        """
+        super().__init__(name="PrefetchWorker", daemon=True)
+        self.summary_store = summary_store
+        self.poll_interval = poll_interval
+        self.max_messages_per_poll = max_messages_per_poll
+        self.handler_factory = handler_factory
+        self.stats = {'polls': 0, 'summarized': 0, 'errors': 0, 'last_poll': None}
+        self._stop_event = threading.Event()
+        self._history_id = None
+        self._pending = deque(maxlen=MAX_PENDING_MESSAGES)
+
+    def run(self):
+        """Poll for new mail until stop() is called."""
+        try:
+            handler = self.handler_factory()
+            handler.summary_store = self.summary_store
+        except Exception as e:
+            logger.error(f"Prefetch worker could not start: {str(e)}")
+            return
+
+        failures = 0
+        while not self._stop_event.is_set():
+            try:
+                self._poll(handler)
+                failures = 0
+                delay = self.poll_interval
+            except Exception as e:
+                failures += 1
+                self.stats['errors'] += 1
+                delay = min(self.poll_interval * 2 ** failures, MAX_BACKOFF_SECONDS)
+                logger.error(f"Prefetch poll failed, retrying in {delay}s: {str(e)}")
+            self._stop_event.wait(delay)
+        logger.info(f"Prefetch worker stopped: {self.stats}")
+
+    def stop(self, timeout=None):
+        """
+        Ask the worker to stop and wait for it to finish its current message.
+
+        Args:
+            timeout (float): Seconds to wait for the thread, or None to wait indefinitely
+        """
+        self._stop_event.set()
+        if self.is_alive():
+            self.join(timeout)
+
+    def _poll(self, handler):
+        """Collect new message ids and summarize up to the per-poll cap."""
+        if self._history_id is None:
+            self._seed(handler)
+        else:
+            self._pending.extend(self._new_message_ids(handler))
+
+        budget = self.max_messages_per_poll
+        while self._pending and budget and not self._stop_event.is_set():
+            message_id = self._pending.popleft()
+            if message_id in self.summary_store:
+                continue
+            handler._summarize_message(message_id)
+            self.stats['summarized'] += 1
+            budget -= 1
+
+        self.stats['polls'] += 1
+        self.stats['last_poll'] = time.time()
+
+    def _seed(self, handler):
+        """Queue today's messages and remember the current mailbox history id."""
+        profile = handler.service.users().getProfile(userId='me', fields='historyId').execute()
+        self._history_id = profile['historyId']
+        self._pending.extend(handler._list_message_ids(handler._todays_query()))
+
+    def _new_message_ids(self, handler):
+        """
+        List inbox messages added since the last poll.
+
+        Returns:
+            list: New message ids, oldest first
+        """
+        message_ids = []
+        page_token = None
+        try:
+            while True:
+                response = handler.service.users().history().list(
+                    userId='me',
+                    startHistoryId=self._history_id,
+                    historyTypes=['messageAdded'],
+                    labelId='INBOX',
+                    pageToken=page_token,
+                    fields='history(messagesAdded(message(id,labelIds))),historyId,nextPageToken'
+                ).execute()
+                for record in response.get('history', []):
+                    for added in record.get('messagesAdded', []):
+                        message = added['message']
+                        if not SKIPPED_LABELS.intersection(message.get('labelIds', [])):
+                            message_ids.append(message['id'])
+                self._history_id = response.get('historyId', self._history_id)
+                page_token = response.get('nextPageToken')
+                if not page_token:
+                    return message_ids
+        except HttpError as e:
+            if e.resp.status == 404:
+                # History id is too old; start again from today's messages
+                logger.info("Prefetch history expired, reseeding")
+                self._history_id = None
+                return []
+            raise
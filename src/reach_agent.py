@@ -2,11 +2,80 @@ from typing import List, Dict, Any
 from .email_handler import EmailHandler
 from .calendar_handler import CalendarHandler
 from .logger import logger
+from .conversation_memory import ConversationMemory
+from .model_session import OLLAMA_KEEP_ALIVE
+from .llm_backend import llm_backend, is_failover_error
 from langchain_ollama import ChatOllama
 from langgraph.prebuilt import create_react_agent
 from langchain_core.messages import convert_to_messages
 import json
 
+AGENT_MODEL = "qwen3:0.6b"
+
+# Static agent instructions; kept byte-stable so Ollama can reuse the evaluated prefix
+AGENT_SYSTEM_PROMPT = """You are an AI assistant specialized in managing emails and calendar events.
+You have access to the following tools:
+    - process_todays_emails: Fetch today's emails, most urgent first; urgent ones are summarized
+    - process_todays_threads: Summarize today's email conversations, one summary per thread
+    - summarize_period: Digest of the emails of a day, week or month
+    - create_event: Create calendar events
+    - get_upcoming_events: Get upcoming calendar events (recurring events listed once)
+    - get_events_in_window: Get every calendar event between two dates, recurring events expanded
+    - send_email: Send emails to specified recipients
+    - mailbox_analytics: Statistics over archived mail (top senders, volume by domain or day, counts)
+    Tools that return lists are paginated. If a result has a next_cursor and you
+    need more items, call the same tool again with cursor set to that value.
+
+    Instructions:
+    1. Always be clear and concise in your responses
+    2. When handling emails:
+        - For reading emails:
+            • Provide a brief summary of each email
+            • List key points or action items
+            • Highlight any urgent or important information
+            • Include sender's email
+        - For sending emails:
+            • Confirm recipient's email address
+            • Verify email subject and content
+            • Format the email professionally
+            • Provide a confirmation of sending
+    3. For calendar events:
+        - Confirm all details (time, date, location, attendees)
+        - Check for conflicts with get_events_in_window before creating
+        - Provide a confirmation summary
+    4. If you're unsure about something, ask for clarification
+    5. Format your responses in a user-friendly way:
+        - Use bullet points for lists
+        - Use clear section headers
+        - Highlight important information
+
+    Example of a good email summary:
+    📧 Email Summary
+    From: sender@example.com
+    Subject: Project Update
+    Key Points:
+    • Project milestone achieved
+    • Next meeting scheduled
+    • Action items for team
+
+    Example of a good email sending response:
+    📧 Email Sent Successfully
+    To: recipient@example.com
+    Subject: Project Update
+    Status: Sent
+    Message ID: [ID]
+
+    Example of a good calendar response:
+    📅 Calendar Event Created
+    Event: Team Meeting
+    Date: [Date]
+    Time: [Time]
+    Location: [Location]
+    Attendees: [List]
+    Confirmation: Event created successfully
+
+    Please process this request and provide a helpful response."""
+
 
 def pretty_print_message(message, indent=False):
     pretty_message = message.pretty_repr(html=True)
@@ -50,79 +119,58 @@ class ReActAssistant:
         self.email_handler = EmailHandler()
         self.calender_handler = CalendarHandler()
         #self.tools = [self.email_handler.get_todays_emails , self.email_handler.summarize_email , self.calender_handler.create_event , self.calender_handler.get_upcoming_events]
-        self.tools = [self.email_handler.send_email , self.email_handler.process_todays_emails , self.calender_handler.create_event , self.calender_handler.get_upcoming_events]
-        
-        self.llm  = ChatOllama(
-            model="qwen3:0.6b",
-            temperature=0,
-             base_url="http://localhost:11434"
-        )
-        self.prompt =  f"""You are an AI assistant specialized in managing emails and calendar events. 
-            You have access to the following tools:
-                - process_todays_emails: Fetch and summarize today's emails
-                - create_event: Create calendar events
-                - get_upcoming_events: Get upcoming calendar events
-                - send_email: Send emails to specified recipients
-
-                Instructions:
-                1. Always be clear and concise in your responses
-                2. When handling emails:
-                    - For reading emails:
-                        • Provide a brief summary of each email
-                        • List key points or action items
-                        • Highlight any urgent or important information
-                        • Include sender's email
-                    - For sending emails:
-                        • Confirm recipient's email address
-                        • Verify email subject and content
-                        • Format the email professionally
-                        • Provide a confirmation of sending
-                3. For calendar events:
-                    - Confirm all details (time, date, location, attendees)
-                    - Check for conflicts before creating
-                    - Provide a confirmation summary
-                4. If you're unsure about something, ask for clarification
-                5. Format your responses in a user-friendly way:
-                    - Use bullet points for lists
-                    - Use clear section headers
-                    - Highlight important information
-
-                Example of a good email summary:
-                📧 Email Summary
-                From: sender@example.com
-                Subject: Project Update
-                Key Points:
-                • Project milestone achieved
-                • Next meeting scheduled
-                • Action items for team
-
-                Example of a good email sending response:
-                📧 Email Sent Successfully
-                To: recipient@example.com
-                Subject: Project Update
-                Status: Sent
-                Message ID: [ID]
-
-                Example of a good calendar response:
-                📅 Calendar Event Created
-                Event: Team Meeting
-                Date: [Date]
-                Time: [Time]
-                Location: [Location]
-                Attendees: [List]
-                Confirmation: Event created successfully
-
-                Please process this request and provide a helpful response."""
-        self.agent = create_react_agent(
-            tools = self.tools,
-            model = self.llm,
-            prompt=self.prompt
-        )
+        self.tools = [self.email_handler.send_email , self.email_handler.process_todays_emails , self.email_handler.process_todays_threads , self.email_handler.summarize_period , self.calender_handler.create_event , self.calender_handler.get_upcoming_events , self.calender_handler.get_events_in_window , self.email_handler.archive.mailbox_analytics]
+        self.prompt = AGENT_SYSTEM_PROMPT
+        # One agent graph per Ollama endpoint, built on first use
+        self.agents = {}
+        self.memory = ConversationMemory()
+
+    def _agent_for(self, host):
+        """Get the agent graph whose model runs on the given Ollama endpoint"""
+        if host not in self.agents:
+            llm = ChatOllama(
+                model=AGENT_MODEL,
+                temperature=0,
+                base_url=host,
+                keep_alive=OLLAMA_KEEP_ALIVE
+            )
+            self.agents[host] = create_react_agent(
+                tools = self.tools,
+                model = llm,
+                prompt=self.prompt
+            )
+        return self.agents[host]
     
+    def _stream(self, host, request_messages, response_chunks, tool_outputs):
+        """Run the agent on one endpoint, collecting its responses and tool outputs"""
+        for chunk in self._agent_for(host).stream({"messages": request_messages}):
+            #pretty_print_messages(chunk)
+            # Store the response instead of just printing
+            if isinstance(chunk, dict) and "agent" in chunk:
+                messages = chunk["agent"]['messages']
+                for m in messages:
+                    if hasattr(m, "content"):
+                        response_chunks.append(m.content)
+            if isinstance(chunk, dict) and "tools" in chunk:
+                for m in chunk["tools"]['messages']:
+                    tool_outputs.append((getattr(m, "name", "tool"), m.content))
+            # if "tool_calls" in chunk['agent']:
+            #     for tool_call in chunk['agent']['tool_calls']:
+            #         execution_history.append({
+            #             'tool':tool_call.get('name' , "unknown"),
+            #             'arguments':tool_call.get('arguments' , {}),
+            #             "result" : tool_call.get('resul',None)
+            #         })
+
     def process_request(self, user_input:str):
         """
         Process a user request and return the agent's response.
 
+        Recent turns and a rolling summary of older ones are sent along with the
+        request, so follow-up questions can refer to earlier results. The request
+        runs on the least loaded Ollama endpoint and moves to another one if the
+        endpoint fails before the agent produced anything.
+
         Args:
             user_input (str): The user's input message
 
@@ -133,28 +181,29 @@ class ReActAssistant:
         try:
             response_chunks = []
             execution_history = []
-            for chunk in self.agent.stream(
-                {"messages": [{"role": "user", "content": user_input}]}):
-                #pretty_print_messages(chunk)
-                # Store the response instead of just printing
-                if isinstance(chunk, dict) and "agent" in chunk:
-                    messages = chunk["agent"]['messages']
-                    for m in messages:
-                        if hasattr(m, "content"):
-                            response_chunks.append(m.content)
-                # if "tool_calls" in chunk['agent']:
-                #     for tool_call in chunk['agent']['tool_calls']:
-                #         execution_history.append({
-                #             'tool':tool_call.get('name' , "unknown"),
-                #             'arguments':tool_call.get('arguments' , {}),
-                #             "result" : tool_call.get('resul',None)
-                #         })
+            tool_outputs = []
+            request_messages = self.memory.context_messages()
+            request_messages.append({"role": "user", "content": user_input})
+            tried = set()
+            while True:
+                try:
+                    with llm_backend.acquire(exclude=tried) as endpoint:
+                        tried.add(endpoint.host)
+                        self._stream(endpoint.host, request_messages, response_chunks, tool_outputs)
+                    break
+                except Exception as e:
+                    # Only retry while no tool has run, so actions are never repeated
+                    if not is_failover_error(e) or response_chunks or tool_outputs \
+                            or len(tried) == len(llm_backend.endpoints):
+                        raise
+                    logger.warning(f"Agent endpoint failed, retrying on another one: {str(e)}")
             if execution_history:
                 logger.info("Tool Execution History :")
                 for entry in execution_history:
                     logger.info(json.dumps(entry , indent = 2))
-            full_response = " ".join(response_chunks)
-            return full_response.strip()
+            full_response = " ".join(response_chunks).strip()
+            self.memory.add_turn(user_input, full_response, tool_outputs)
+            return full_response
         
         except Exception as e:
             import traceback
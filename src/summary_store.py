@@ -0,0 +1,68 @@
+import threading
+from collections import OrderedDict
+
+# Upper bound on cached email summaries before the oldest are evicted
+MAX_STORED_SUMMARIES = 500
+
+
+class SummaryStore:
+    """
+    Thread-safe, size-bounded store of email summaries keyed by message id.
+
+    Summaries produced interactively and by the background prefetch worker are
+    kept here, so a message is only summarized once. When the store is full the
+    least recently used entry is evicted.
+
+    Attributes:
+        max_entries (int): Maximum number of summaries kept
+    """
+
+    def __init__(self, max_entries=MAX_STORED_SUMMARIES):
+        """
+        Initialize an empty store.
+
+        Args:
+            max_entries (int): Maximum number of summaries kept
+        """
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, message_id):
+        """
+        Look up a stored summary.
+
+        Args:
+            message_id (str): Gmail message id
+
+        Returns:
+            dict: Copy of the stored summary record, or None if missing
+        """
+        with self._lock:
+            record = self._entries.get(message_id)
+            if record is None:
+                return None
+            self._entries.move_to_end(message_id)
+            return dict(record)
+
+    def put(self, message_id, record):
+        """
+        Store a summary record, evicting the least recently used one if full.
+
+        Args:
+            message_id (str): Gmail message id
+            record (dict): Summary record to store
+        """
+        with self._lock:
+            self._entries[message_id] = dict(record)
+            self._entries.move_to_end(message_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __contains__(self, message_id):
+        with self._lock:
+            return message_id in self._entries
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
@@ -0,0 +1,309 @@
+import os
+import re
+import time
+import zlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from google.oauth2.credentials import Credentials
+from google.auth.transport.requests import Request
+from .email_handler import EmailHandler
+from .calendar_handler import CalendarHandler
+from .logger import logger
+
+# Directory holding one sub-directory of tokens per user
+TENANT_TOKEN_DIR = "tokens"
+# Handler pairs kept alive per worker process before the least recently used is evicted
+MAX_CLIENTS_PER_WORKER = 32
+# Seconds an idle handler pair is kept before it is rebuilt
+CLIENT_TTL_SECONDS = 1800
+
+GMAIL_SCOPES = ['https://www.googleapis.com/auth/gmail.readonly',
+                "https://www.googleapis.com/auth/gmail.send"]
+CALENDAR_SCOPES = ['https://www.googleapis.com/auth/calendar']
+
+# Operations a tenant request may run, mapped to the handler that owns them
+TENANT_OPERATIONS = {
+    'process_todays_emails': 'email',
+    'process_emails_by_date_range': 'email',
+    'send_email': 'email',
+    'archive_emails_by_date_range': 'email',
+    'summarize_period': 'email',
+    'create_event': 'calendar',
+    'get_upcoming_events': 'calendar',
+    'get_events_in_window': 'calendar',
+}
+
+_USER_ID_PATTERN = re.compile(r'^[A-Za-z0-9._@+-]+$')
+
+
+class CredentialStore:
+    """
+    Load per-user OAuth credentials from a token directory.
+
+    Each user has a directory <token_dir>/<user_id>/ containing token.json for
+    Gmail and calendar_token.json for Calendar, next to the user's mail archive
+    and digest store. Serving mode never starts an interactive OAuth flow; a
+    user without usable tokens is rejected.
+
+    Attributes:
+        token_dir (str): Root directory of the per-user token directories
+    """
+
+    def __init__(self, token_dir=TENANT_TOKEN_DIR):
+        """
+        Initialize the credential store.
+
+        Args:
+            token_dir (str): Root directory of the per-user token directories
+        """
+        self.token_dir = token_dir
+
+    def user_dir(self, user_id):
+        """
+        Build the path of a user's directory, which holds their tokens and local stores.
+
+        Args:
+            user_id (str): Tenant user id
+
+        Returns:
+            str: Path of the user's directory
+
+        Raises:
+            ValueError: If the user id contains characters not allowed in a directory name
+        """
+        if not _USER_ID_PATTERN.match(user_id or '') or user_id in ('.', '..'):
+            raise ValueError(f"Invalid user id: {user_id!r}")
+        return os.path.join(self.token_dir, user_id)
+
+    def token_path(self, user_id, filename):
+        """
+        Build the path of one of a user's token files.
+
+        Args:
+            user_id (str): Tenant user id
+            filename (str): token.json or calendar_token.json
+
+        Returns:
+            str: Path of the token file
+
+        Raises:
+            ValueError: If the user id contains characters not allowed in a directory name
+        """
+        return os.path.join(self.user_dir(user_id), filename)
+
+    def load(self, user_id, filename, scopes):
+        """
+        Load and, if needed, refresh a user's credentials.
+
+        Args:
+            user_id (str): Tenant user id
+            filename (str): token.json or calendar_token.json
+            scopes (list): OAuth scopes the token must carry
+
+        Returns:
+            Credentials: Valid credentials for the user
+
+        Raises:
+            RuntimeError: If the token is missing or cannot be refreshed
+        """
+        path = self.token_path(user_id, filename)
+        if not os.path.exists(path):
+            raise RuntimeError(f"No {filename} for user {user_id}")
+        creds = Credentials.from_authorized_user_file(path, scopes)
+        if not creds.valid:
+            if not (creds.expired and creds.refresh_token):
+                raise RuntimeError(f"Credentials in {filename} for user {user_id} cannot be refreshed")
+            creds.refresh(Request())
+            with open(path, 'w') as token:
+                token.write(creds.to_json())
+        return creds
+
+
+class ClientPool:
+    """
+    Per-user cache of EmailHandler and CalendarHandler pairs.
+
+    Handlers are built lazily with the user's own credentials, so summary caches
+    and API clients are never shared between users. The pool evicts the least
+    recently used user when full and rebuilds entries older than the TTL.
+
+    Attributes:
+        credential_store (CredentialStore): Source of per-user credentials
+        max_clients (int): Maximum number of users kept
+        ttl (float): Seconds an entry is kept before it is rebuilt
+        api_endpoint (str): Optional Google API base URL, e.g. a local stand-in server
+    """
+
+    def __init__(self, credential_store, max_clients=MAX_CLIENTS_PER_WORKER,
+                 ttl=CLIENT_TTL_SECONDS, api_endpoint=None):
+        """
+        Initialize an empty pool.
+
+        Args:
+            credential_store (CredentialStore): Source of per-user credentials
+            max_clients (int): Maximum number of users kept
+            ttl (float): Seconds an entry is kept before it is rebuilt
+            api_endpoint (str): Optional Google API base URL
+        """
+        self.credential_store = credential_store
+        self.max_clients = max_clients
+        self.ttl = ttl
+        self.api_endpoint = api_endpoint
+        self._clients = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        """
+        Get the handlers for a user, building them if needed.
+
+        Args:
+            user_id (str): Tenant user id
+
+        Returns:
+            dict: Dictionary with 'email' and 'calendar' handlers for the user
+        """
+        with self._lock:
+            entry = self._clients.get(user_id)
+            if entry and time.monotonic() - entry['created'] < self.ttl:
+                self._clients.move_to_end(user_id)
+                return entry['handlers']
+
+            user_dir = self.credential_store.user_dir(user_id)
+            handlers = {
+                'email': EmailHandler(
+                    token_path=self.credential_store.token_path(user_id, 'token.json'),
+                    creds=self.credential_store.load(user_id, 'token.json', GMAIL_SCOPES),
+                    api_endpoint=self.api_endpoint,
+                    archive_dir=os.path.join(user_dir, 'mail_archive'),
+                    digest_dir=os.path.join(user_dir, 'digests')
+                ),
+                'calendar': CalendarHandler(
+                    token_path=self.credential_store.token_path(user_id, 'calendar_token.json'),
+                    creds=self.credential_store.load(user_id, 'calendar_token.json', CALENDAR_SCOPES),
+                    api_endpoint=self.api_endpoint
+                ),
+            }
+            self._clients[user_id] = {'handlers': handlers, 'created': time.monotonic()}
+            self._clients.move_to_end(user_id)
+            while len(self._clients) > self.max_clients:
+                evicted, _ = self._clients.popitem(last=False)
+                logger.info(f"Evicted clients for user {evicted}")
+            return handlers
+
+    def __len__(self):
+        with self._lock:
+            return len(self._clients)
+
+
+# Client pool of the current worker process, created by _init_worker
+_worker_pool = None
+
+
+def _init_worker(token_dir, max_clients, ttl, api_endpoint):
+    """Create the client pool of a worker process."""
+    global _worker_pool
+    _worker_pool = ClientPool(CredentialStore(token_dir), max_clients, ttl, api_endpoint)
+
+
+def _run_operation(user_id, operation, args, kwargs):
+    """Run one tenant operation inside a worker process."""
+    handlers = _worker_pool.get(user_id)
+    handler = handlers[TENANT_OPERATIONS[operation]]
+    return getattr(handler, operation)(*args, **kwargs)
+
+
+class TenantDispatcher:
+    """
+    Dispatch assistant operations for many users across worker processes.
+
+    Every user is pinned to one worker process by a stable hash of the user id,
+    so each process only builds and caches clients for its own share of users.
+    Requests for users on different workers run in parallel, spreading both the
+    LLM-heavy and the I/O-heavy work across cores.
+
+    Example:
+        with TenantDispatcher(workers=4) as dispatcher:
+            future = dispatcher.submit("alice@example.com", "process_todays_emails")
+            print(future.result())
+
+    Attributes:
+        workers (int): Number of worker processes
+    """
+
+    def __init__(self, workers=None, token_dir=TENANT_TOKEN_DIR, max_clients=MAX_CLIENTS_PER_WORKER,
+                 ttl=CLIENT_TTL_SECONDS, api_endpoint=None):
+        """
+        Start the worker processes.
+
+        Args:
+            workers (int): Number of worker processes (defaults to the CPU count)
+            token_dir (str): Root directory of the per-user token directories
+            max_clients (int): Users cached per worker process
+            ttl (float): Seconds a user's clients are kept before they are rebuilt
+            api_endpoint (str): Optional Google API base URL, e.g. a local stand-in server
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self._credential_store = CredentialStore(token_dir)
+        self._executors = [
+            ProcessPoolExecutor(
+                max_workers=1,
+                initializer=_init_worker,
+                initargs=(token_dir, max_clients, ttl, api_endpoint)
+            )
+            for _ in range(self.workers)
+        ]
+
+    def submit(self, user_id, operation, *args, **kwargs):
+        """
+        Queue an operation for a user.
+
+        Args:
+            user_id (str): Tenant user id
+            operation (str): One of TENANT_OPERATIONS
+            *args: Positional arguments for the operation
+            **kwargs: Keyword arguments for the operation
+
+        Returns:
+            Future: Resolves to the operation's result
+
+        Raises:
+            ValueError: If the operation or user id is not allowed
+        """
+        if operation not in TENANT_OPERATIONS:
+            raise ValueError(f"Unsupported operation: {operation}")
+        # Reject bad user ids before they reach a worker
+        self._credential_store.user_dir(user_id)
+        executor = self._executors[zlib.crc32(user_id.encode('utf-8')) % self.workers]
+        return executor.submit(_run_operation, user_id, operation, args, kwargs)
+
+    def call(self, user_id, operation, *args, **kwargs):
+        """
+        Run an operation for a user and wait for its result.
+
+        Args:
+            user_id (str): Tenant user id
+            operation (str): One of TENANT_OPERATIONS
+            *args: Positional arguments for the operation
+            **kwargs: Keyword arguments for the operation
+
+        Returns:
+            The operation's result
+        """
+        return self.submit(user_id, operation, *args, **kwargs).result()
+
+    def shutdown(self, wait=True):
+        """
+        Stop all worker processes.
+
+        Args:
+            wait (bool): Wait for queued operations to finish
+        """
+        for executor in self._executors:
+            executor.shutdown(wait=wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.shutdown()
@@ -0,0 +1,135 @@
+import json
+from .logger import logger
+
+# Hard cap on the serialized size of a single tool result handed to the agent
+MAX_TOOL_RESULT_CHARS = 2000
+# Default number of records returned per page
+DEFAULT_PAGE_SIZE = 5
+# String fields are never cut below this length when shrinking a page
+MIN_FIELD_CHARS = 40
+
+EMAIL_FIELDS = ('id', 'from', 'subject', 'received', 'priority', 'summary')
+
+
+def project(record, fields):
+    """
+    Keep only the requested fields of a record.
+
+    Args:
+        record (dict): Source record
+        fields (iterable): Field names to keep
+
+    Returns:
+        dict: Record containing only the requested fields that are present
+    """
+    return {field: record[field] for field in fields if field in record}
+
+
+def encode_cursor(offset):
+    """
+    Encode a list offset as an opaque cursor string.
+
+    Args:
+        offset (int): Index of the first record of the next page
+
+    Returns:
+        str: Cursor to hand back to the agent
+    """
+    return str(offset)
+
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor produced by encode_cursor.
+
+    Args:
+        cursor (str): Cursor from a previous tool result, or None
+
+    Returns:
+        int: Offset of the first record of the page (0 for a missing or invalid cursor)
+    """
+    try:
+        return max(int(cursor), 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def compact_event(event):
+    """
+    Project a Calendar API event resource onto the fields the agent uses.
+
+    Args:
+        event (dict): Calendar event resource
+
+    Returns:
+        dict: Compact event with id, summary, start, end, location, attendees and,
+              for recurring events, the recurrence rule
+    """
+    compact = {
+        'id': event.get('id'),
+        'summary': event.get('summary', ''),
+        'start': event.get('start', {}).get('dateTime') or event.get('start', {}).get('date'),
+        'end': event.get('end', {}).get('dateTime') or event.get('end', {}).get('date'),
+    }
+    if event.get('location'):
+        compact['location'] = event['location']
+    if event.get('attendees'):
+        compact['attendees'] = [a.get('email') for a in event['attendees']]
+    if event.get('recurrence'):
+        compact['recurrence'] = [line for line in event['recurrence'] if line.startswith('RRULE')]
+    return compact
+
+
+def compact_page(items, next_cursor=None, total=None, max_chars=MAX_TOOL_RESULT_CHARS, name="tool",
+                 offset=None):
+    """
+    Build a size-capped page of tool results.
+
+    When the serialized page is larger than max_chars, long string fields are
+    shortened evenly across items until it fits. If it is still too large once
+    every long field is down to MIN_FIELD_CHARS, trailing items are dropped
+    (keeping at least one) and next_cursor is moved back to the first dropped
+    item, so nothing is skipped when the agent asks for the next page.
+
+    Args:
+        items (list): Compact records for this page
+        next_cursor (str): Cursor for the next page, or None if this is the last page
+        total (int): Total number of records available, if known
+        max_chars (int): Maximum serialized size of the result
+        name (str): Tool name used when logging the result size
+        offset (int): Offset of the first item in the full result list. Items are only
+                      dropped when it is given, since the cursor is computed from it.
+
+    Returns:
+        dict: Dictionary with items, returned, total and next_cursor
+    """
+    page = {
+        'items': items,
+        'returned': len(items),
+        'total': total,
+        'next_cursor': next_cursor
+    }
+    size = len(json.dumps(page, default=str))
+    if size > max_chars and items:
+        overflow = size - max_chars
+        long_fields = [
+            (item, key) for item in items for key, value in item.items()
+            if isinstance(value, str) and len(value) > MIN_FIELD_CHARS
+        ]
+        if long_fields:
+            cut = overflow // len(long_fields) + len(" ...")
+            for item, key in long_fields:
+                keep = max(len(item[key]) - cut, MIN_FIELD_CHARS)
+                item[key] = item[key][:keep] + " ..."
+        size = len(json.dumps(page, default=str))
+
+    if size > max_chars and offset is not None and len(items) > 1:
+        while size > max_chars and len(items) > 1:
+            items.pop()
+            page['returned'] = len(items)
+            page['next_cursor'] = encode_cursor(offset + len(items))
+            size = len(json.dumps(page, default=str))
+        logger.info(f"Tool result {name}: page cut to {len(items)} item(s) to fit {max_chars} chars")
+
+    logger.info(f"Tool result {name}: {len(items)} item(s), {size} chars (~{size // 4} tokens)")
+    return page
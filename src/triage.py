@@ -0,0 +1,74 @@
+import re
+
+# Phrases that signal a deadline or a date the reader has to act on
+DEADLINE_PATTERN = re.compile(
+    r"\b(?:urgent|asap|immediately|deadline|overdue|action required|final notice|time[- ]sensitive"
+    r"|due (?:today|tomorrow|by|on|date)"
+    r"|by (?:eod|cob|end of (?:day|week)|today|tonight|tomorrow|noon"
+    r"|monday|tuesday|wednesday|thursday|friday|saturday|sunday|\d{1,2}(?::\d{2})?\s*(?:am|pm))"
+    r"|today|tonight|tomorrow)\b",
+    re.IGNORECASE
+)
+# Precedence header values used by mailing lists and bulk senders
+BULK_PRECEDENCE = ('bulk', 'list', 'junk')
+
+# Score contribution of each triage feature
+TRIAGE_WEIGHTS = {
+    'replied_thread': 3,
+    'to_me': 1,
+    'known_sender': 1,
+    'deadline': 2,
+    'deadline_in_subject': 1,
+    'thread_activity': 1,
+    'promotional': -2,
+    'bulk': -2,
+}
+# Most extra messages in a thread that count towards thread activity
+MAX_THREAD_ACTIVITY = 2
+# Scores at or above this are high priority, at or below LOW_PRIORITY_SCORE low priority
+HIGH_PRIORITY_SCORE = 3
+LOW_PRIORITY_SCORE = -1
+PRIORITIES = ('high', 'normal', 'low')
+
+
+def deadline_mentions(text):
+    """
+    Find deadline and date phrases in a piece of text.
+
+    Args:
+        text (str): Subject or snippet of an email
+
+    Returns:
+        list: Matched phrases, lowercased, without duplicates
+    """
+    return list(dict.fromkeys(match.lower() for match in DEADLINE_PATTERN.findall(text or '')))
+
+
+def triage_score(features):
+    """
+    Score an email's urgency and importance from its triage features.
+
+    Args:
+        features (dict): Dictionary with replied_thread, to_me, known_sender, promotional
+                         and bulk (bools), deadline_in_subject and deadline_in_snippet
+                         (lists of phrases) and thread_messages (int)
+
+    Returns:
+        tuple: (score, priority) where priority is 'high', 'normal' or 'low'
+    """
+    score = 0
+    for flag in ('replied_thread', 'to_me', 'known_sender', 'promotional', 'bulk'):
+        if features.get(flag):
+            score += TRIAGE_WEIGHTS[flag]
+    if features.get('deadline_in_subject') or features.get('deadline_in_snippet'):
+        score += TRIAGE_WEIGHTS['deadline']
+    if features.get('deadline_in_subject'):
+        score += TRIAGE_WEIGHTS['deadline_in_subject']
+    extra_messages = min(max(features.get('thread_messages', 1) - 1, 0), MAX_THREAD_ACTIVITY)
+    score += extra_messages * TRIAGE_WEIGHTS['thread_activity']
+
+    if score >= HIGH_PRIORITY_SCORE:
+        return score, 'high'
+    if score <= LOW_PRIORITY_SCORE:
+        return score, 'low'
+    return score, 'normal'
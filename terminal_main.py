@@ -2,6 +2,8 @@ import warnings
 warnings.filterwarnings('ignore')
 
 from src.chat_interface import ChatInterface
+from src.model_session import model_session
+from src.llm_backend import llm_backend
 import sys
 from rich.console import Console
 from rich.markdown import Markdown
@@ -25,14 +27,11 @@ def print_welcome_message():
 
 def main():
     console = Console()
-    chat_interface = ChatInterface()
+    chat_interface = ChatInterface(prefetch="--prefetch" in sys.argv)
     
     # Print welcome message
     print_welcome_message()
     
-    # Initialize conversation history
-    conversation_history = []
-    
     while True:
         try:
             # Get user input
@@ -40,6 +39,8 @@ def main():
             
             # Check for exit command
             if user_input.lower() in ['exit', 'quit']:
+                console.print(f"\n[dim]Model latency: {model_session.latency_report()}[/dim]")
+                console.print(f"[dim]Ollama endpoints: {llm_backend.status()}[/dim]")
                 console.print("\n[bold green]Thank you for using Personal Assistant! Goodbye! 👋[/bold green]")
                 break
             
@@ -52,10 +53,6 @@ def main():
             console.print("\n[bold green]Assistant:[/bold green]")
             console.print(Markdown(response))
             
-            # Update conversation history
-            conversation_history.append({"role": "user", "content": user_input})
-            conversation_history.append({"role": "assistant", "content": response})
-            
         except KeyboardInterrupt:
             console.print("\n\n[bold red]Session interrupted. Goodbye![/bold red]")
             break
@@ -63,5 +60,7 @@ def main():
             console.print(f"\n[bold red]Error: {str(e)}[/bold red]")
             continue
 
+    chat_interface.close()
+
 if __name__ == "__main__":
     main() 
\ No newline at end of file